@@ -0,0 +1,57 @@
+"""add signed transaction columns
+
+Revision ID: 5c1e7a9d3f42
+Revises: 371f8414c52d
+Create Date: 2026-10-14 09:12:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5c1e7a9d3f42"
+down_revision: Union[str, Sequence[str], None] = "371f8414c52d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SIGNED_QUANTITY_SQL = "CASE WHEN type = 'BUY' THEN quantity WHEN type = 'SELL' THEN -quantity ELSE 0 END"
+SIGNED_COST_SQL = (
+    "CASE WHEN type = 'BUY' THEN quantity * price WHEN type = 'SELL' THEN -(quantity * price) ELSE 0 END"
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "transactions",
+        sa.Column(
+            "signed_quantity",
+            sa.Numeric(precision=24, scale=8),
+            sa.Computed(SIGNED_QUANTITY_SQL, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "transactions",
+        sa.Column(
+            "signed_cost",
+            sa.Numeric(precision=24, scale=8),
+            sa.Computed(SIGNED_COST_SQL, persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_transactions_signed",
+        "transactions",
+        ["portfolio_id", "ticker"],
+        postgresql_include=["signed_quantity", "signed_cost"],
+        postgresql_where=sa.text("type IN ('BUY','SELL')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_signed", table_name="transactions")
+    op.drop_column("transactions", "signed_cost")
+    op.drop_column("transactions", "signed_quantity")
@@ -0,0 +1,36 @@
+"""cover prices ticker date index
+
+Revision ID: 8e4b2d6c0a17
+Revises: 5c1e7a9d3f42
+Create Date: 2026-10-14 10:03:27.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8e4b2d6c0a17"
+down_revision: Union[str, Sequence[str], None] = "5c1e7a9d3f42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRICE_INCLUDE_COLUMNS = ["id", "open", "high", "low", "close", "volume"]
+
+
+def upgrade() -> None:
+    op.drop_index("ix_prices_ticker_date", table_name="prices")
+    op.create_index(
+        "ix_prices_ticker_date",
+        "prices",
+        ["ticker", sa.text("date DESC")],
+        unique=True,
+        postgresql_include=PRICE_INCLUDE_COLUMNS,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_prices_ticker_date", table_name="prices")
+    op.create_index("ix_prices_ticker_date", "prices", ["ticker", "date"], unique=True)
@@ -0,0 +1,31 @@
+"""add buy sell partial index
+
+Revision ID: b3f90c41e7d5
+Revises: 8e4b2d6c0a17
+Create Date: 2026-10-14 10:41:05.872613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b3f90c41e7d5"
+down_revision: Union[str, Sequence[str], None] = "8e4b2d6c0a17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_transactions_buysell",
+        "transactions",
+        ["portfolio_id", "ticker", "date"],
+        postgresql_where=sa.text("type IN ('BUY','SELL')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_buysell", table_name="transactions")
@@ -0,0 +1,98 @@
+"""partition prices by ticker hash
+
+Revision ID: d7a25e83c9b1
+Revises: b3f90c41e7d5
+Create Date: 2026-10-14 11:26:52.304177
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d7a25e83c9b1"
+down_revision: Union[str, Sequence[str], None] = "b3f90c41e7d5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRICE_PARTITIONS = 16
+PRICE_COLUMNS = "id, ticker, date, open, high, low, close, volume"
+PRICE_INCLUDE_COLUMNS = ["id", "open", "high", "low", "close", "volume"]
+
+
+def _price_columns() -> list[sa.Column]:
+    return [
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('prices_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("ticker", sa.String(length=16), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("open", sa.Numeric(precision=18, scale=6), nullable=True),
+        sa.Column("high", sa.Numeric(precision=18, scale=6), nullable=True),
+        sa.Column("low", sa.Numeric(precision=18, scale=6), nullable=True),
+        sa.Column("close", sa.Numeric(precision=18, scale=6), nullable=True),
+        sa.Column("volume", sa.BigInteger(), nullable=True),
+    ]
+
+
+def _create_price_indexes() -> None:
+    op.create_index(op.f("ix_prices_ticker"), "prices", ["ticker"], unique=False)
+    op.create_index(
+        "ix_prices_ticker_date",
+        "prices",
+        ["ticker", sa.text("date DESC")],
+        unique=True,
+        postgresql_include=PRICE_INCLUDE_COLUMNS,
+    )
+
+
+def _detach_prices() -> None:
+    # Keep the id sequence alive while the old table is dropped.
+    op.execute("ALTER SEQUENCE prices_id_seq OWNED BY NONE")
+    op.drop_index("ix_prices_ticker_date", table_name="prices")
+    op.drop_index(op.f("ix_prices_ticker"), table_name="prices")
+    op.execute("ALTER TABLE prices RENAME CONSTRAINT prices_pkey TO prices_old_pkey")
+    op.rename_table("prices", "prices_old")
+
+
+def _copy_and_drop_old_prices() -> None:
+    op.execute(f"INSERT INTO prices ({PRICE_COLUMNS}) SELECT {PRICE_COLUMNS} FROM prices_old")
+    op.drop_table("prices_old")
+    op.execute("ALTER SEQUENCE prices_id_seq OWNED BY prices.id")
+
+
+def upgrade() -> None:
+    _detach_prices()
+
+    # Partitioned tables need the partition key in every unique constraint,
+    # so the primary key becomes (id, ticker).
+    op.create_table(
+        "prices",
+        *_price_columns(),
+        sa.PrimaryKeyConstraint("id", "ticker", name="prices_pkey"),
+        postgresql_partition_by="HASH (ticker)",
+    )
+    for remainder in range(PRICE_PARTITIONS):
+        op.execute(
+            f"CREATE TABLE prices_p{remainder} PARTITION OF prices "
+            f"FOR VALUES WITH (MODULUS {PRICE_PARTITIONS}, REMAINDER {remainder})"
+        )
+    _create_price_indexes()
+    _copy_and_drop_old_prices()
+
+
+def downgrade() -> None:
+    _detach_prices()
+
+    op.create_table(
+        "prices",
+        *_price_columns(),
+        sa.PrimaryKeyConstraint("id", name="prices_pkey"),
+    )
+    _create_price_indexes()
+    _copy_and_drop_old_prices()
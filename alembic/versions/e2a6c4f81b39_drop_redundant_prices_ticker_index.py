@@ -0,0 +1,26 @@
+"""drop redundant prices ticker index
+
+Revision ID: e2a6c4f81b39
+Revises: d7a25e83c9b1
+Create Date: 2026-10-14 11:41:08.215377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2a6c4f81b39"
+down_revision: Union[str, Sequence[str], None] = "d7a25e83c9b1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ix_prices_ticker_date leads with ticker, so it already serves ticker-only lookups.
+    op.drop_index(op.f("ix_prices_ticker"), table_name="prices")
+
+
+def downgrade() -> None:
+    op.create_index(op.f("ix_prices_ticker"), "prices", ["ticker"], unique=False)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from typing import List
 
 from pydantic import Field
@@ -27,12 +27,12 @@ class Settings(BaseSettings):
     scheduler_enabled: bool = Field(default=False, alias="SCHEDULER_ENABLED")
     watchlist_raw: str = Field(default="", alias="WATCHLIST")
 
-    @property
+    @cached_property
     def allowed_origins(self) -> List[str]:
         items = [item.strip() for item in self.allowed_origins_raw.split(",") if item.strip()]
         return items or DEFAULT_ALLOWED_ORIGINS.copy()
 
-    @property
+    @cached_property
     def watchlist(self) -> List[str]:
         if not self.watchlist_raw:
             return []
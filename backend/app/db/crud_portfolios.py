@@ -3,7 +3,7 @@
 import uuid
 from typing import Sequence
 
-from sqlalchemy import func, select
+from sqlalchemy import exists, func, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -44,6 +44,26 @@ async def list_portfolios(
     return result.scalars().all()
 
 
+async def list_portfolios_with_total(
+    session: AsyncSession,
+    *,
+    limit: int = 100,
+    offset: int = 0,
+) -> tuple[Sequence[Portfolio], int]:
+    """Return one page of portfolios and the overall count using ``COUNT(*) OVER ()``."""
+    stmt = (
+        select(Portfolio, func.count().over().label("total"))
+        .order_by(Portfolio.created_at.asc())
+        .limit(limit)
+        .offset(offset)
+    )
+    result = await session.execute(stmt)
+    rows = result.all()
+    if not rows:
+        return [], (await count_portfolios(session) if offset else 0)
+    return [row.Portfolio for row in rows], int(rows[0].total)
+
+
 async def count_portfolios(session: AsyncSession) -> int:
     result = await session.execute(select(func.count()).select_from(Portfolio))
     return int(result.scalar_one())
@@ -65,6 +85,11 @@ async def get_portfolio(
     return portfolio
 
 
+async def portfolio_exists(session: AsyncSession, portfolio_id: uuid.UUID) -> bool:
+    result = await session.execute(select(exists().where(Portfolio.id == portfolio_id)))
+    return bool(result.scalar())
+
+
 async def delete_portfolio(session: AsyncSession, portfolio_id: uuid.UUID) -> None:
     portfolio = await get_portfolio(session, portfolio_id)
     await session.delete(portfolio)
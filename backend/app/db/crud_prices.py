@@ -1,18 +1,39 @@
 from datetime import date as dt_date
 from decimal import Decimal
-from typing import Dict, Iterable, Sequence
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Iterable, Sequence
 
-from sqlalchemy import Select, func, select
+from sqlalchemy import Row, Select, func, lambda_stmt, select, text
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models import Price
 
+# Batches at or above EXECUTEMANY_THRESHOLD are sent as one executemany (a single
+# pipelined asyncpg call) instead of a multi-row VALUES list; on asyncpg, batches at
+# or above COPY_THRESHOLD are staged with COPY and merged in one statement.
+EXECUTEMANY_THRESHOLD = 100
+COPY_THRESHOLD = 1000
+_CONFLICT_COLUMNS = ("ticker", "date")
+_PRICE_COLUMNS = (*_CONFLICT_COLUMNS, "open", "high", "low", "close", "volume")
+_UPDATE_COLUMNS = tuple(column for column in _PRICE_COLUMNS if column not in _CONFLICT_COLUMNS)
+_STAGE_TABLE = "prices_stage"
+_STREAM_BATCH_SIZE = 1000
+_PRICE_QUANT = Decimal("0.000001")
+_CANDLE_COLUMNS = (Price.date, Price.open, Price.high, Price.low, Price.close, Price.volume)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_ticker(ticker: str) -> str:
+    return ticker.upper()
+
 
 def _to_decimal(value):
     if value is None:
         return None
-    return Decimal(str(round(float(value), 6)))
+    if isinstance(value, Decimal):
+        return value.quantize(_PRICE_QUANT)
+    return Decimal(value).quantize(_PRICE_QUANT)
 
 
 def _to_date(value):
@@ -28,7 +49,7 @@ async def upsert_prices(
     ticker: str,
     rows: Iterable[dict],
 ) -> int:
-    ticker = ticker.upper()
+    ticker = _normalize_ticker(ticker)
     payload = []
     for row in rows:
         payload.append(
@@ -46,18 +67,48 @@ async def upsert_prices(
     if not payload:
         return 0
 
-    stmt = insert(Price).values(payload)
-    stmt = stmt.on_conflict_do_update(
-        index_elements=["ticker", "date"],
-        set_={
-            "open": stmt.excluded.open,
-            "high": stmt.excluded.high,
-            "low": stmt.excluded.low,
-            "close": stmt.excluded.close,
-            "volume": stmt.excluded.volume,
-        },
+    if len(payload) >= COPY_THRESHOLD and session.get_bind().dialect.driver == "asyncpg":
+        return await _copy_upsert_prices(session, payload)
+
+    if len(payload) >= EXECUTEMANY_THRESHOLD:
+        await session.execute(_upsert_statement(insert(Price)), payload)
+        # Each input row is either inserted or updated exactly once.
+        return len(payload)
+
+    result = await session.execute(_upsert_statement(insert(Price).values(payload)))
+    return result.rowcount or 0
+
+
+def _upsert_statement(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=list(_CONFLICT_COLUMNS),
+        set_={column: stmt.excluded[column] for column in _UPDATE_COLUMNS},
+    )
+
+
+async def _copy_upsert_prices(session: AsyncSession, payload: Sequence[dict]) -> int:
+    """Stage rows through asyncpg COPY and merge them into prices in a single statement."""
+    await session.execute(
+        text(f"CREATE TEMP TABLE IF NOT EXISTS {_STAGE_TABLE} (LIKE prices INCLUDING DEFAULTS) ON COMMIT DROP")
+    )
+    await session.execute(text(f"TRUNCATE {_STAGE_TABLE}"))
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        _STAGE_TABLE,
+        records=[tuple(row[column] for column in _PRICE_COLUMNS) for row in payload],
+        columns=list(_PRICE_COLUMNS),
+    )
+
+    columns = ", ".join(_PRICE_COLUMNS)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in _UPDATE_COLUMNS)
+    result = await session.execute(
+        text(
+            f"INSERT INTO prices ({columns}) "
+            f"SELECT {columns} FROM {_STAGE_TABLE} "
+            f"ON CONFLICT ({', '.join(_CONFLICT_COLUMNS)}) DO UPDATE SET {updates}"
+        )
     )
-    result = await session.execute(stmt)
     return result.rowcount or 0
 
 
@@ -67,16 +118,18 @@ async def read_prices_range(
     start: dt_date,
     end: dt_date | None,
 ) -> Sequence[Price]:
-    stmt = select(Price).where(Price.ticker == ticker.upper(), Price.date >= start)
+    normalized = _normalize_ticker(ticker)
+    stmt = lambda_stmt(lambda: select(Price).where(Price.ticker == normalized, Price.date >= start))
     if end is not None:
-        stmt = stmt.where(Price.date <= end)
-    stmt = stmt.order_by(Price.date.asc())
+        stmt += lambda s: s.where(Price.date <= end)
+    stmt += lambda s: s.order_by(Price.date.asc())
     result = await session.execute(stmt)
     return result.scalars().all()
 
 
 async def get_last_date(session: AsyncSession, ticker: str) -> dt_date | None:
-    stmt = select(func.max(Price.date)).where(Price.ticker == ticker.upper())
+    normalized = _normalize_ticker(ticker)
+    stmt = lambda_stmt(lambda: select(func.max(Price.date)).where(Price.ticker == normalized))
     result = await session.execute(stmt)
     return result.scalar_one_or_none()
 
@@ -87,9 +140,12 @@ async def count_prices_range(
     start: dt_date,
     end: dt_date | None,
 ) -> int:
-    stmt = select(func.count()).select_from(Price).where(Price.ticker == ticker.upper(), Price.date >= start)
+    normalized = _normalize_ticker(ticker)
+    stmt = lambda_stmt(
+        lambda: select(func.count()).select_from(Price).where(Price.ticker == normalized, Price.date >= start)
+    )
     if end is not None:
-        stmt = stmt.where(Price.date <= end)
+        stmt += lambda s: s.where(Price.date <= end)
     result = await session.execute(stmt)
     return int(result.scalar_one())
 
@@ -101,28 +157,90 @@ async def read_prices_range_paged(
     end: dt_date | None,
     limit: int = 200,
     offset: int = 0,
-) -> Sequence[Price]:
-    stmt = select(Price).where(Price.ticker == ticker.upper(), Price.date >= start)
+    after: dt_date | None = None,
+) -> Sequence[Row]:
+    """Return one page of ``(date, open, high, low, close, volume)`` rows ordered by date.
+
+    Pass the last date of the previous page as ``after`` to seek past it on the
+    ``(ticker, date)`` index; ``offset`` is ignored in that case.
+    """
+    normalized = _normalize_ticker(ticker)
+    stmt = lambda_stmt(lambda: select(*_CANDLE_COLUMNS).where(Price.ticker == normalized, Price.date >= start))
     if end is not None:
-        stmt = stmt.where(Price.date <= end)
-    stmt = stmt.order_by(Price.date.asc()).limit(limit).offset(offset)
+        stmt += lambda s: s.where(Price.date <= end)
+    stmt += lambda s: s.order_by(Price.date.asc()).limit(limit)
+    if after is not None:
+        stmt += lambda s: s.where(Price.date > after)
+    else:
+        stmt += lambda s: s.offset(offset)
     result = await session.execute(stmt)
-    return result.scalars().all()
+    return result.all()
+
+
+async def read_prices_range_paged_with_total(
+    session: AsyncSession,
+    ticker: str,
+    start: dt_date,
+    end: dt_date | None,
+    limit: int = 200,
+    offset: int = 0,
+    after: dt_date | None = None,
+) -> tuple[Sequence[Row], int]:
+    """Return one page of prices and the size of the whole range in a single query.
+
+    The total rides along as ``COUNT(*) OVER ()``. Keyset pages and pages past the
+    end carry no usable window total, so those fall back to ``count_prices_range``.
+    """
+    if after is not None:
+        rows = await read_prices_range_paged(session, ticker, start, end, limit=limit, after=after)
+        return rows, await count_prices_range(session, ticker, start, end)
+
+    normalized = _normalize_ticker(ticker)
+    stmt = lambda_stmt(
+        lambda: select(*_CANDLE_COLUMNS, func.count().over().label("total")).where(
+            Price.ticker == normalized, Price.date >= start
+        )
+    )
+    if end is not None:
+        stmt += lambda s: s.where(Price.date <= end)
+    stmt += lambda s: s.order_by(Price.date.asc()).limit(limit).offset(offset)
+    result = await session.execute(stmt)
+    rows = result.all()
+    if not rows:
+        return [], (await count_prices_range(session, ticker, start, end) if offset else 0)
+    return rows, int(rows[0].total)
+
+
+async def stream_prices_range(
+    session: AsyncSession,
+    ticker: str,
+    start: dt_date,
+    end: dt_date | None,
+) -> AsyncIterator[Row]:
+    """Yield ``(date, open, high, low, close, volume)`` rows through a server-side cursor.
+
+    asyncpg only opens cursors inside a transaction, so use a transactional session.
+    """
+    stmt = select(*_CANDLE_COLUMNS).where(Price.ticker == _normalize_ticker(ticker), Price.date >= start)
+    if end is not None:
+        stmt = stmt.where(Price.date <= end)
+    stmt = stmt.order_by(Price.date.asc()).execution_options(yield_per=_STREAM_BATCH_SIZE)
+    result = await session.stream(stmt)
+    async for row in result:
+        yield row
 
 
 async def get_last_price(session: AsyncSession, ticker: str) -> Price | None:
-    stmt = (
-        select(Price)
-        .where(Price.ticker == ticker.upper())
-        .order_by(Price.date.desc())
-        .limit(1)
+    normalized = _normalize_ticker(ticker)
+    stmt = lambda_stmt(
+        lambda: select(Price).where(Price.ticker == normalized).order_by(Price.date.desc()).limit(1)
     )
     result = await session.execute(stmt)
     return result.scalar_one_or_none()
 
 
 async def get_latest_prices_for(session: AsyncSession, tickers: Sequence[str]) -> Dict[str, Price]:
-    normalized = sorted({ticker.upper() for ticker in tickers if ticker})
+    normalized = list(dict.fromkeys(_normalize_ticker(ticker) for ticker in tickers if ticker))
     if not normalized:
         return {}
 
@@ -142,18 +260,22 @@ async def load_price_history_for_tickers(
     tickers: Sequence[str],
     start: dt_date,
     end: dt_date | None,
-) -> Dict[str, list[Price]]:
-    normalized = sorted({ticker.upper() for ticker in tickers if ticker})
+) -> Dict[str, list[Row[tuple[str, dt_date, Decimal | None]]]]:
+    """Return ``(ticker, date, close)`` rows per ticker, ordered by date.
+
+    Selects plain columns instead of ``Price`` entities so no ORM instances are built.
+    """
+    normalized = list(dict.fromkeys(_normalize_ticker(ticker) for ticker in tickers if ticker))
     if not normalized:
         return {}
 
-    stmt = select(Price).where(Price.ticker.in_(normalized), Price.date >= start)
+    stmt = select(Price.ticker, Price.date, Price.close).where(Price.ticker.in_(normalized), Price.date >= start)
     if end is not None:
         stmt = stmt.where(Price.date <= end)
     stmt = stmt.order_by(Price.ticker.asc(), Price.date.asc())
 
     result = await session.execute(stmt)
-    data: Dict[str, list[Price]] = {ticker: [] for ticker in normalized}
-    for price in result.scalars():
-        data.setdefault(price.ticker, []).append(price)
+    data: Dict[str, list[Row[tuple[str, dt_date, Decimal | None]]]] = {ticker: [] for ticker in normalized}
+    for row in result:
+        data[row.ticker].append(row)
     return data
@@ -6,13 +6,30 @@ from decimal import Decimal, InvalidOperation
 from typing import Sequence
 
 import sqlalchemy as sa
-from sqlalchemy import Select, case, func, select
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    RowMapping,
+    Select,
+    StatementLambdaElement,
+    func,
+    insert,
+    lambda_stmt,
+    select,
+    tuple_,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .errors import InvalidTransactionError, TransactionNotFoundError
-from .models import Portfolio, Transaction, TransactionType
+from .errors import InvalidTransactionError, PortfolioNotFoundError, TransactionNotFoundError
+from .models import Transaction, TransactionType
 
 _DECIMAL_QUANT = Decimal("0.00000001")
+_BULK_CHUNK_SIZE = 1000
+_SORT_KEY = (Transaction.date, Transaction.created_at, Transaction.id)
+_BUY_SELL_TYPES = (TransactionType.BUY, TransactionType.SELL)
+_BUY_SELL = frozenset(_BUY_SELL_TYPES)
+_CREDIT = frozenset({TransactionType.DIVIDEND, TransactionType.FEE})
 
 
 def _to_decimal(value: Decimal | float | int | str | None) -> Decimal | None:
@@ -27,7 +44,7 @@ def _to_decimal(value: Decimal | float | int | str | None) -> Decimal | None:
 
 
 def _normalize_ticker(ticker: str) -> str:
-    if not ticker or not ticker.strip():
+    if not isinstance(ticker, str) or not ticker.strip():
         raise InvalidTransactionError("Ticker is required")
     return ticker.strip().upper()
 
@@ -35,6 +52,8 @@ def _normalize_ticker(ticker: str) -> str:
 def _resolve_type(value: TransactionType | str) -> TransactionType:
     if isinstance(value, TransactionType):
         return value
+    if not isinstance(value, str):
+        raise InvalidTransactionError("Transaction type is required")
     try:
         return TransactionType(value.upper())
     except ValueError as exc:
@@ -49,35 +68,75 @@ def _validate_payload(
     price: Decimal | None,
     amount: Decimal | None,
     tx_date: date,
+    today: date,
 ) -> None:
-    if tx_date > date.today():
+    if not isinstance(tx_date, date):
+        raise InvalidTransactionError("Transaction date is required")
+    if tx_date > today:
         raise InvalidTransactionError("Transaction date cannot be in the future")
 
-    if tx_type in {TransactionType.BUY, TransactionType.SELL}:
+    if tx_type in _BUY_SELL:
         if quantity is None or quantity <= 0:
             raise InvalidTransactionError("Quantity must be > 0 for BUY/SELL")
         if price is None or price < 0:
             raise InvalidTransactionError("Price must be >= 0 for BUY/SELL")
-    else:
+    elif tx_type in _CREDIT:
         if amount is None or amount < 0:
             raise InvalidTransactionError("Amount must be >= 0 for DIVIDEND/FEE")
 
 
+def _is_foreign_key_violation(exc: IntegrityError) -> bool:
+    orig = exc.orig
+    return getattr(orig, "sqlstate", None) == "23503" or "FOREIGN KEY constraint failed" in str(orig)
+
+
+def _constraint_error(exc: Exception, portfolio_id: uuid.UUID) -> Exception:
+    if isinstance(exc, IntegrityError) and _is_foreign_key_violation(exc):
+        return PortfolioNotFoundError(str(portfolio_id))
+    return InvalidTransactionError("Transaction violates database constraints")
+
+
 def _base_select(portfolio_id: uuid.UUID) -> Select[tuple[Transaction]]:
     return select(Transaction).where(Transaction.portfolio_id == portfolio_id)
 
 
-async def create_transaction(
-    session: AsyncSession,
+def _with_filters(
+    stmt: StatementLambdaElement,
+    *,
+    start: date | None,
+    end: date | None,
+    ticker: str | None,
+) -> StatementLambdaElement:
+    if start is not None:
+        stmt += lambda s: s.where(Transaction.date >= start)
+    if end is not None:
+        stmt += lambda s: s.where(Transaction.date <= end)
+    if ticker:
+        normalized = _normalize_ticker(ticker)
+        stmt += lambda s: s.where(Transaction.ticker == normalized)
+    return stmt
+
+
+def _after_cursor(portfolio_id: uuid.UUID, after_id: uuid.UUID) -> ColumnElement[bool]:
+    cursor = (
+        select(*_SORT_KEY)
+        .where(Transaction.portfolio_id == portfolio_id, Transaction.id == after_id)
+        .subquery("cursor")
+    )
+    return tuple_(*_SORT_KEY) > tuple_(cursor.c.date, cursor.c.created_at, cursor.c.id)
+
+
+def _build_values(
+    portfolio_id: uuid.UUID,
     *,
-    portfolio: Portfolio,
     ticker: str,
     tx_type: TransactionType | str,
     tx_date: date,
     quantity: Decimal | float | int | str | None,
     price: Decimal | float | int | str | None,
     amount: Decimal | float | int | str | None,
-) -> Transaction:
+    today: date,
+) -> dict:
     normalized_type = _resolve_type(tx_type)
     normalized_ticker = _normalize_ticker(ticker)
     quantity_dec = _to_decimal(quantity)
@@ -90,29 +149,99 @@ async def create_transaction(
         price=price_dec,
         amount=amount_dec,
         tx_date=tx_date,
+        today=today,
     )
 
-    transaction = Transaction(
-        portfolio_id=portfolio.id,
-        ticker=normalized_ticker,
-        date=tx_date,
-        type=normalized_type,
-        quantity=quantity_dec,
-        price=price_dec,
-        amount=amount_dec,
+    return {
+        "portfolio_id": portfolio_id,
+        "ticker": normalized_ticker,
+        "date": tx_date,
+        "type": normalized_type,
+        "quantity": quantity_dec,
+        "price": price_dec,
+        "amount": amount_dec,
+    }
+
+
+async def create_transaction(
+    session: AsyncSession,
+    *,
+    portfolio_id: uuid.UUID,
+    ticker: str,
+    tx_type: TransactionType | str,
+    tx_date: date,
+    quantity: Decimal | float | int | str | None,
+    price: Decimal | float | int | str | None,
+    amount: Decimal | float | int | str | None,
+) -> Transaction:
+    """Insert one transaction; a missing portfolio surfaces through its foreign key."""
+    values = _build_values(
+        portfolio_id,
+        ticker=ticker,
+        tx_type=tx_type,
+        tx_date=tx_date,
+        quantity=quantity,
+        price=price,
+        amount=amount,
+        today=date.today(),
     )
 
-    session.add(transaction)
+    stmt = insert(Transaction).values(**values).returning(Transaction)
     try:
-        await session.flush()
+        result = await session.execute(stmt)
     except Exception as exc:
-        raise InvalidTransactionError("Transaction violates database constraints") from exc
+        raise _constraint_error(exc, portfolio_id) from exc
 
-    await session.refresh(transaction)
+    transaction = result.scalar_one()
     session.expunge(transaction)
     return transaction
 
 
+async def create_transactions_many(
+    session: AsyncSession,
+    *,
+    portfolio_id: uuid.UUID,
+    rows: Sequence[dict],
+) -> list[Transaction]:
+    """Insert many transactions using batched multi-VALUES INSERT ... RETURNING.
+
+    Each row accepts the same keys as ``create_transaction`` keyword arguments
+    (``ticker``, ``tx_type``, ``tx_date``, ``quantity``, ``price``, ``amount``).
+    Every row is validated before anything is written; a missing portfolio
+    surfaces through its foreign key, as in ``create_transaction``.
+    """
+    today = date.today()
+    payloads = [
+        _build_values(
+            portfolio_id,
+            ticker=row.get("ticker"),
+            tx_type=row.get("tx_type"),
+            tx_date=row.get("tx_date"),
+            quantity=row.get("quantity"),
+            price=row.get("price"),
+            amount=row.get("amount"),
+            today=today,
+        )
+        for row in rows
+    ]
+    if not payloads:
+        return []
+
+    stmt = insert(Transaction).returning(Transaction, sort_by_parameter_order=True)
+    transactions: list[Transaction] = []
+    for offset in range(0, len(payloads), _BULK_CHUNK_SIZE):
+        chunk = payloads[offset : offset + _BULK_CHUNK_SIZE]
+        try:
+            result = await session.execute(stmt, chunk)
+        except Exception as exc:
+            raise _constraint_error(exc, portfolio_id) from exc
+        transactions.extend(result.scalars().all())
+
+    for transaction in transactions:
+        session.expunge(transaction)
+    return transactions
+
+
 async def list_transactions(
     session: AsyncSession,
     *,
@@ -122,20 +251,60 @@ async def list_transactions(
     ticker: str | None = None,
     limit: int = 100,
     offset: int = 0,
+    after_id: uuid.UUID | None = None,
 ) -> Sequence[Transaction]:
-    stmt = _base_select(portfolio_id)
-    if start is not None:
-        stmt = stmt.where(Transaction.date >= start)
-    if end is not None:
-        stmt = stmt.where(Transaction.date <= end)
-    if ticker:
-        stmt = stmt.where(Transaction.ticker == _normalize_ticker(ticker))
-
-    stmt = stmt.order_by(Transaction.date.asc(), Transaction.created_at.asc()).limit(limit).offset(offset)
+    """Return one page of transactions ordered by date, creation time and id.
+
+    Pass the id of the last transaction of the previous page as ``after_id`` to
+    seek past it instead of scanning ``offset`` rows; ``offset`` is ignored then.
+    """
+    stmt = _with_filters(lambda_stmt(lambda: _base_select(portfolio_id)), start=start, end=end, ticker=ticker)
+    stmt += lambda s: s.order_by(*_SORT_KEY).limit(limit)
+    if after_id is not None:
+        stmt += lambda s: s.where(_after_cursor(portfolio_id, after_id))
+    else:
+        stmt += lambda s: s.offset(offset)
     result = await session.execute(stmt)
     return result.scalars().all()
 
 
+async def list_transactions_with_total(
+    session: AsyncSession,
+    *,
+    portfolio_id: uuid.UUID,
+    start: date | None = None,
+    end: date | None = None,
+    ticker: str | None = None,
+    limit: int = 100,
+    offset: int = 0,
+    after_id: uuid.UUID | None = None,
+) -> tuple[Sequence[Transaction], int]:
+    """Return one page of transactions and the filtered total in a single query.
+
+    The total rides along as ``COUNT(*) OVER ()``. Keyset pages and pages past the
+    end carry no usable window total, so those fall back to ``count_transactions``.
+    """
+    filters = {"start": start, "end": end, "ticker": ticker}
+    if after_id is not None:
+        rows = await list_transactions(
+            session, portfolio_id=portfolio_id, limit=limit, after_id=after_id, **filters
+        )
+        return rows, await count_transactions(session, portfolio_id=portfolio_id, **filters)
+
+    stmt = lambda_stmt(
+        lambda: select(Transaction, func.count().over().label("total")).where(
+            Transaction.portfolio_id == portfolio_id
+        )
+    )
+    stmt = _with_filters(stmt, **filters)
+    stmt += lambda s: s.order_by(*_SORT_KEY).limit(limit).offset(offset)
+    result = await session.execute(stmt)
+    rows = result.all()
+    if not rows:
+        return [], (await count_transactions(session, portfolio_id=portfolio_id, **filters) if offset else 0)
+    return [row.Transaction for row in rows], int(rows[0].total)
+
+
 async def count_transactions(
     session: AsyncSession,
     *,
@@ -144,13 +313,10 @@ async def count_transactions(
     end: date | None = None,
     ticker: str | None = None,
 ) -> int:
-    stmt = select(func.count()).select_from(Transaction).where(Transaction.portfolio_id == portfolio_id)
-    if start is not None:
-        stmt = stmt.where(Transaction.date >= start)
-    if end is not None:
-        stmt = stmt.where(Transaction.date <= end)
-    if ticker:
-        stmt = stmt.where(Transaction.ticker == _normalize_ticker(ticker))
+    stmt = lambda_stmt(
+        lambda: select(func.count()).select_from(Transaction).where(Transaction.portfolio_id == portfolio_id)
+    )
+    stmt = _with_filters(stmt, start=start, end=end, ticker=ticker)
     result = await session.execute(stmt)
     return int(result.scalar_one())
 
@@ -161,7 +327,7 @@ async def get_transaction(
     portfolio_id: uuid.UUID,
     transaction_id: uuid.UUID,
 ) -> Transaction:
-    stmt = _base_select(portfolio_id).where(Transaction.id == transaction_id)
+    stmt = lambda_stmt(lambda: _base_select(portfolio_id).where(Transaction.id == transaction_id))
     result = await session.execute(stmt)
     transaction = result.scalar_one_or_none()
     if transaction is None:
@@ -179,41 +345,37 @@ async def delete_transaction(
     await session.delete(transaction)
 
 
-async def get_all_transactions(
+async def load_quantity_deltas(
     session: AsyncSession,
     *,
     portfolio_id: uuid.UUID,
     up_to: date | None = None,
-) -> Sequence[Transaction]:
-    stmt = _base_select(portfolio_id)
+) -> Sequence[Row[tuple[date, str, Decimal | None]]]:
+    """Return ``(date, ticker, signed_quantity)`` rows in date order; non-trade rows carry zero."""
+    stmt = select(Transaction.date, Transaction.ticker, Transaction.signed_quantity).where(
+        Transaction.portfolio_id == portfolio_id
+    )
     if up_to is not None:
         stmt = stmt.where(Transaction.date <= up_to)
     stmt = stmt.order_by(Transaction.date.asc(), Transaction.created_at.asc())
     result = await session.execute(stmt)
-    return result.scalars().all()
+    return result.all()
 
 
-async def aggregate_positions(session: AsyncSession, *, portfolio_id: uuid.UUID) -> Sequence[dict]:
-    qty_case = case(
-        (Transaction.type == TransactionType.BUY, Transaction.quantity),
-        (Transaction.type == TransactionType.SELL, -Transaction.quantity),
-        else_=sa.literal(0, type_=sa.Numeric(24, 8)),
-    )
-    cost_case = case(
-        (Transaction.type == TransactionType.BUY, Transaction.quantity * Transaction.price),
-        (Transaction.type == TransactionType.SELL, -Transaction.quantity * Transaction.price),
-        else_=sa.literal(0, type_=sa.Numeric(24, 8)),
-    )
-
+async def aggregate_positions(session: AsyncSession, *, portfolio_id: uuid.UUID) -> Sequence[RowMapping]:
+    zero = sa.literal(0, type_=sa.Numeric(24, 8))
     stmt = (
         select(
             Transaction.ticker,
-            func.coalesce(func.sum(qty_case), Decimal(0)).label("quantity"),
-            func.coalesce(func.sum(cost_case), Decimal(0)).label("cost"),
+            func.coalesce(func.sum(Transaction.signed_quantity), zero).label("quantity"),
+            func.coalesce(func.sum(Transaction.signed_cost), zero).label("cost"),
+        )
+        .where(
+            Transaction.portfolio_id == portfolio_id,
+            Transaction.type.in_(_BUY_SELL_TYPES),
         )
-        .where(Transaction.portfolio_id == portfolio_id)
         .group_by(Transaction.ticker)
         .order_by(Transaction.ticker.asc())
     )
     result = await session.execute(stmt)
-    return [dict(row._mapping) for row in result]
+    return result.mappings().all()
@@ -9,6 +9,7 @@ from sqlalchemy import (
     BigInteger,
     Integer,
     CheckConstraint,
+    Computed,
     Date,
     DateTime,
     Enum,
@@ -17,18 +18,25 @@ from sqlalchemy import (
     Numeric,
     String,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
 
+SIGNED_QUANTITY_SQL = "CASE WHEN type = 'BUY' THEN quantity WHEN type = 'SELL' THEN -quantity ELSE 0 END"
+SIGNED_COST_SQL = (
+    "CASE WHEN type = 'BUY' THEN quantity * price WHEN type = 'SELL' THEN -(quantity * price) ELSE 0 END"
+)
+BUY_SELL_PREDICATE = "type IN ('BUY','SELL')"
+
 
 class Price(Base):
     __tablename__ = "prices"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    ticker: Mapped[str] = mapped_column(String(16), nullable=False, index=True)
+    ticker: Mapped[str] = mapped_column(String(16), nullable=False)
     date: Mapped[date] = mapped_column(Date, nullable=False)
     open: Mapped[Decimal | None] = mapped_column(Numeric(18, 6))
     high: Mapped[Decimal | None] = mapped_column(Numeric(18, 6))
@@ -36,8 +44,17 @@ class Price(Base):
     close: Mapped[Decimal | None] = mapped_column(Numeric(18, 6))
     volume: Mapped[int | None] = mapped_column(BigInteger)
 
+    # On PostgreSQL the table is hash-partitioned by ticker with a (id, ticker)
+    # primary key; see migration d7a25e83c9b1. The mapping keeps ``id`` as identity.
+    # The (ticker, date DESC) index also serves ticker-only lookups.
     __table_args__ = (
-        Index("ix_prices_ticker_date", "ticker", "date", unique=True),
+        Index(
+            "ix_prices_ticker_date",
+            "ticker",
+            text("date DESC"),
+            unique=True,
+            postgresql_include=["id", "open", "high", "low", "close", "volume"],
+        ),
     )
 
 
@@ -85,12 +102,25 @@ class Transaction(Base):
     ticker: Mapped[str] = mapped_column(String(16), nullable=False)
     date: Mapped[date] = mapped_column(Date, nullable=False)
     type: Mapped[TransactionType] = mapped_column(
-        Enum(TransactionType, name="transaction_type"),
+        Enum(
+            TransactionType,
+            name="transaction_type",
+            native_enum=True,
+            values_callable=lambda enum_cls: [member.value for member in enum_cls],
+        ),
         nullable=False,
     )
     quantity: Mapped[Decimal | None] = mapped_column(Numeric(24, 8))
     price: Mapped[Decimal | None] = mapped_column(Numeric(24, 8))
     amount: Mapped[Decimal | None] = mapped_column(Numeric(24, 8))
+    signed_quantity: Mapped[Decimal | None] = mapped_column(
+        Numeric(24, 8),
+        Computed(SIGNED_QUANTITY_SQL, persisted=True),
+    )
+    signed_cost: Mapped[Decimal | None] = mapped_column(
+        Numeric(24, 8),
+        Computed(SIGNED_COST_SQL, persisted=True),
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         nullable=False,
@@ -101,6 +131,22 @@ class Transaction(Base):
 
     __table_args__ = (
         Index("ix_transactions_portfolio_ticker_date", "portfolio_id", "ticker", "date"),
+        Index(
+            "ix_transactions_signed",
+            "portfolio_id",
+            "ticker",
+            postgresql_include=["signed_quantity", "signed_cost"],
+            postgresql_where=text(BUY_SELL_PREDICATE),
+            sqlite_where=text(BUY_SELL_PREDICATE),
+        ),
+        Index(
+            "ix_transactions_buysell",
+            "portfolio_id",
+            "ticker",
+            "date",
+            postgresql_where=text(BUY_SELL_PREDICATE),
+            sqlite_where=text(BUY_SELL_PREDICATE),
+        ),
         CheckConstraint(
             "(type IN ('BUY','SELL') AND quantity IS NOT NULL AND quantity > 0 AND price IS NOT NULL AND price >= 0)"
             " OR (type NOT IN ('BUY','SELL'))",
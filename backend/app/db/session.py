@@ -1,22 +1,62 @@
 from __future__ import annotations
 
+import asyncio
 from typing import AsyncIterator
 
-from sqlalchemy import text
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from ..core.settings import get_settings
 
 _engine: AsyncEngine | None = None
 SessionLocal: async_sessionmaker[AsyncSession] | None = None
+ReadSessionLocal: async_sessionmaker[AsyncSession] | None = None
+
+INSERTMANYVALUES_PAGE_SIZE = 1000
+POOL_SIZE = 20
+
+
+def _engine_options(url: str) -> dict:
+    if make_url(url).get_backend_name() != "postgresql":
+        return {}
+    return {
+        "insertmanyvalues_page_size": INSERTMANYVALUES_PAGE_SIZE,
+        "pool_size": POOL_SIZE,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    }
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, _record) -> None:
+    # SQLite ignores foreign keys unless asked; match PostgreSQL so FK checks behave the same.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
 
 
 def configure_engine(database_url: str | None = None) -> None:
-    global _engine, SessionLocal
+    global _engine, SessionLocal, ReadSessionLocal
     settings = get_settings()
     url = database_url or settings.database_url
-    _engine = create_async_engine(url, echo=settings.env.lower() == "dev", future=True)
+    _engine = create_async_engine(
+        url,
+        echo=settings.env.lower() == "dev",
+        future=True,
+        **_engine_options(url),
+    )
+    if make_url(url).get_backend_name() == "sqlite":
+        event.listen(_engine.sync_engine, "connect", _enable_sqlite_foreign_keys)
     SessionLocal = async_sessionmaker(_engine, expire_on_commit=False, class_=AsyncSession)
+    # Plain reads skip BEGIN/ROLLBACK on PostgreSQL; the autocommit engine shares the same pool.
+    read_bind = (
+        _engine.execution_options(isolation_level="AUTOCOMMIT")
+        if make_url(url).get_backend_name() == "postgresql"
+        else _engine
+    )
+    ReadSessionLocal = async_sessionmaker(read_bind, expire_on_commit=False, class_=AsyncSession)
 
 
 def _require_session_local() -> async_sessionmaker[AsyncSession]:
@@ -41,6 +81,13 @@ async def get_db_session() -> AsyncIterator[AsyncSession]:
         yield session
 
 
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    """Session for single-statement reads; runs in autocommit mode on PostgreSQL."""
+    _require_session_local()
+    async with ReadSessionLocal() as session:  # type: ignore[misc]
+        yield session
+
+
 def get_engine() -> AsyncEngine:
     return _require_engine()
 
@@ -51,4 +98,17 @@ async def check_connection() -> None:
         await conn.execute(text("SELECT 1"))
 
 
+async def warm_pool() -> None:
+    """Open the pool's base connections concurrently so early requests skip the handshake."""
+    engine = _require_engine()
+    size_fn = getattr(engine.pool, "size", None)
+    size = size_fn() if callable(size_fn) else 1
+    await asyncio.gather(*(check_connection() for _ in range(size)))
+
+
+async def dispose_engine() -> None:
+    if _engine is not None:
+        await _engine.dispose()
+
+
 configure_engine()
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 from contextlib import asynccontextmanager
 from datetime import date, timedelta
+from functools import lru_cache
+import hashlib
 import logging
+import re
 from typing import AsyncIterator, List
 from uuid import UUID
 
-from fastapi import FastAPI, HTTPException, Path, Query, Response, status
+import numpy as np
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Path, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from .core.settings import get_settings
 from .db import crud_portfolios, crud_prices, crud_transactions
@@ -19,12 +28,21 @@ from .db.errors import (
     PortfolioNotFoundError,
     TransactionNotFoundError,
 )
-from .db.session import check_connection, get_sessionmaker
+from .db.models import Portfolio, Transaction
+from .db.session import (
+    check_connection,
+    dispose_engine,
+    get_db_session,
+    get_read_session,
+    get_sessionmaker,
+    warm_pool,
+)
 from .schemas import (
     AdvancedMetricsResponse,
     BasicMetricsResponse,
     HealthResponse,
     HistoryResponse,
+    Interval,
     LastDbPriceResponse,
     LastPriceResponse,
     MessageResponse,
@@ -48,16 +66,146 @@ settings = get_settings()
 logging.basicConfig(level=settings.log_level)
 logger = logging.getLogger(__name__)
 
+# Pages at least this large are converted to response models on a worker thread.
+_OFFLOAD_ROWS = 100
+
+# Market-data reads change at most intraday (last close) or daily (ranges and derived metrics).
+_HTTP_CACHE_RULES = (
+    (re.compile(r"^/prices/[^/]+/last$"), 60),
+    (re.compile(r"^/(prices/[^/]+/range|metrics/[^/]+/(basic|advanced)|signals/[^/]+/tech)$"), 3600),
+)
+
+
+def _portfolio_out(portfolio: Portfolio) -> PortfolioOut:
+    # Rows come straight from the database, so skip re-validating every field.
+    return PortfolioOut.model_construct(id=portfolio.id, name=portfolio.name, created_at=portfolio.created_at)
+
+
+def _transaction_out(transaction: Transaction) -> TransactionOut:
+    return TransactionOut.model_construct(
+        id=transaction.id,
+        portfolio_id=transaction.portfolio_id,
+        ticker=transaction.ticker,
+        date=transaction.date,
+        type=transaction.type,
+        quantity=transaction.quantity,
+        price=transaction.price,
+        amount=transaction.amount,
+        created_at=transaction.created_at,
+    )
+
+
+# A cache hit is several times cheaper than date.isoformat(), and stored trading days repeat across requests.
+_iso_date = lru_cache(maxsize=8192)(date.isoformat)
+
+
+def _optional_float(value) -> float | None:
+    return None if value is None else float(value)
+
+
+def _candle(row) -> dict:
+    day, open_, high, low, close, volume = row[:6]
+    return {
+        "date": _iso_date(day),
+        "open": _optional_float(open_),
+        "high": _optional_float(high),
+        "low": _optional_float(low),
+        "close": _optional_float(close),
+        "volume": volume,
+    }
+
 
 @asynccontextmanager
-async def session_scope() -> AsyncIterator[AsyncSession]:
-    maker = get_sessionmaker()
-    async with maker() as session:
-        yield session
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    try:
+        await warm_pool()
+    except (SQLAlchemyError, OSError):
+        # asyncpg raises bare OSErrors (e.g. ConnectionRefusedError) that SQLAlchemy does not wrap.
+        logger.warning("Could not pre-open database connections", exc_info=True)
+    yield
+    await dispose_engine()
+
+
+app = FastAPI(
+    title="Portfolio Manager API",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 
-app = FastAPI(title="Portfolio Manager API", version="0.1.0")
+def _cache_max_age(path: str) -> int | None:
+    for pattern, max_age in _HTTP_CACHE_RULES:
+        if pattern.match(path):
+            return max_age
+    return None
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    candidates = {item.strip().removeprefix("W/") for item in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+class ConditionalMarketDataMiddleware:
+    """Add ETag/Cache-Control to market-data GETs and answer matching If-None-Match with 304.
+
+    Pure ASGI so every other route passes straight through without buffering.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        max_age = None
+        if scope["type"] == "http" and scope["method"] == "GET":
+            max_age = _cache_max_age(scope["path"])
+        if max_age is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        chunks: list[bytes] = []
+
+        async def buffered_send(message: Message) -> None:
+            nonlocal start
+            if start is None:
+                start = message
+                if message["status"] != status.HTTP_200_OK:
+                    await send(message)
+                return
+            if start["status"] != status.HTTP_200_OK:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            cache_control = f"public, max-age={max_age}"
+            if _etag_matches(Headers(scope=scope).get("if-none-match"), etag):
+                headers = MutableHeaders()
+                headers["ETag"] = etag
+                headers["Cache-Control"] = cache_control
+                await send(
+                    {"type": "http.response.start", "status": status.HTTP_304_NOT_MODIFIED, "headers": headers.raw}
+                )
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            headers = MutableHeaders(raw=list(start.get("headers", [])))
+            headers["ETag"] = etag
+            headers["Cache-Control"] = cache_control
+            headers["Content-Length"] = str(len(body))
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, buffered_send)
 
+
+app.add_middleware(ConditionalMarketDataMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.allowed_origins,
@@ -81,7 +229,7 @@ def health() -> HealthResponse:
 async def ready() -> HealthResponse:
     try:
         await check_connection()
-    except SQLAlchemyError as exc:  # pragma: no cover - infrastructure failure
+    except (SQLAlchemyError, OSError) as exc:  # pragma: no cover - infrastructure failure
         logger.exception("Database readiness check failed")
         raise HTTPException(status_code=503, detail="Database not ready") from exc
     return HealthResponse(status="ok")
@@ -97,7 +245,7 @@ def price_range(
     ticker: str,
     start: date,
     end: date | None = None,
-    interval: str = Query("1d", pattern="^(1d|1wk|1mo)$"),
+    interval: Interval = Query("1d"),
 ) -> HistoryResponse:
     if end is not None and start > end:
         raise HTTPException(status_code=422, detail="start must be on or before end")
@@ -155,18 +303,18 @@ async def ingest_prices(
     ticker: str,
     start: date,
     end: date | None = None,
-    interval: str = Query("1d", pattern="^(1d|1wk|1mo)$"),
+    interval: Interval = Query("1d"),
+    session: AsyncSession = Depends(get_db_session),
 ) -> dict:
     if end is not None and start > end:
         raise HTTPException(status_code=422, detail="start must be on or before end")
-    payload = get_history(ticker, start, end, interval)
+    payload = await asyncio.to_thread(get_history, ticker, start, end, interval)
     rows = payload.get("data", [])
     if not rows:
         raise HTTPException(status_code=404, detail="No data to ingest")
 
-    async with session_scope() as session:
-        async with session.begin():
-            affected = await crud_prices.upsert_prices(session, ticker, rows)
+    async with session.begin():
+        affected = await crud_prices.upsert_prices(session, ticker, rows)
 
     return {
         "ticker": payload["ticker"],
@@ -189,47 +337,65 @@ async def db_price_range(
     end: date | None = None,
     limit: int = Query(200, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-) -> HistoryResponse:
+    after: date | None = Query(None, description="Return rows dated after this cursor (ignores offset)"),
+    session: AsyncSession = Depends(get_read_session),
+) -> ORJSONResponse:
     if end is not None and start > end:
         raise HTTPException(status_code=422, detail="start must be on or before end")
-    async with session_scope() as session:
-        total = await crud_prices.count_prices_range(session, ticker, start, end)
-        rows = await crud_prices.read_prices_range_paged(session, ticker, start, end, limit=limit, offset=offset)
-
-    records = []
-    for record in rows:
-        records.append(
-            {
-                "date": record.date.isoformat(),
-                "open": float(record.open) if record.open is not None else None,
-                "high": float(record.high) if record.high is not None else None,
-                "low": float(record.low) if record.low is not None else None,
-                "close": float(record.close) if record.close is not None else None,
-                "volume": int(record.volume) if record.volume is not None else None,
-            }
-        )
+    rows, total = await crud_prices.read_prices_range_paged_with_total(
+        session, ticker, start, end, limit=limit, offset=offset, after=after
+    )
 
-    return HistoryResponse(
-        ticker=ticker.upper(),
-        interval="1d",
-        start=start.isoformat(),
-        end=None if end is None else end.isoformat(),
-        count=len(records),
-        data=records,
-        total=total,
-        limit=limit,
-        offset=offset,
+    records = [_candle(row) for row in rows]
+
+    # The rows come from the database already typed, so skip validating every candle.
+    return ORJSONResponse(
+        {
+            "ticker": ticker.upper(),
+            "interval": "1d",
+            "start": start.isoformat(),
+            "end": None if end is None else end.isoformat(),
+            "count": len(records),
+            "data": records,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+        }
     )
 
 
+@app.get(
+    "/prices/{ticker}/db/range.ndjson",
+    response_class=StreamingResponse,
+    summary="Stream prices from DB as NDJSON",
+)
+async def db_price_range_ndjson(
+    ticker: str,
+    start: date,
+    end: date | None = None,
+) -> StreamingResponse:
+    if end is not None and start > end:
+        raise HTTPException(status_code=422, detail="start must be on or before end")
+
+    async def lines() -> AsyncIterator[bytes]:
+        # Dependencies are torn down before the body is streamed, so the generator owns its session.
+        async with get_sessionmaker()() as session:
+            async for row in crud_prices.stream_prices_range(session, ticker, start, end):
+                yield orjson.dumps(_candle(row)) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.get(
     "/prices/{ticker}/db/last",
     response_model=LastDbPriceResponse,
     summary="Last stored price in DB",
 )
-async def db_last_price(ticker: str) -> LastDbPriceResponse:
-    async with session_scope() as session:
-        record = await crud_prices.get_last_price(session, ticker)
+async def db_last_price(
+    ticker: str,
+    session: AsyncSession = Depends(get_read_session),
+) -> LastDbPriceResponse:
+    record = await crud_prices.get_last_price(session, ticker)
     if record is None:
         raise HTTPException(status_code=404, detail="Ticker has no stored prices")
     return LastDbPriceResponse(
@@ -249,65 +415,46 @@ async def db_last_price(ticker: str) -> LastDbPriceResponse:
 )
 async def ingest_latest(
     ticker: str,
-    interval: str = Query("1d", pattern="^(1d|1wk|1mo)$"),
+    interval: Interval = Query("1d"),
+    session: AsyncSession = Depends(get_db_session),
 ) -> dict:
     normalized = ticker.upper()
     today = date.today()
 
-    async with session_scope() as session:
-        last_date = await crud_prices.get_last_date(session, normalized)
-        if last_date is None:
-            await session.rollback()
-            raise HTTPException(
-                status_code=404,
-                detail="Ticker has no stored prices. Ingest a range first.",
-            )
-
-        start = last_date + timedelta(days=1)
-        if start > today:
-            await session.rollback()
-            return {
-                "ticker": normalized,
-                "interval": interval,
-                "start": start.isoformat(),
-                "end": today.isoformat(),
-                "ingested": 0,
-                "upsert_effect": 0,
-                "status": "up_to_date",
-            }
-
-        payload = get_history(normalized, start, today, interval)
-        if payload["count"] == 0 or not payload.get("data"):
-            await session.rollback()
-            return {
-                "ticker": normalized,
-                "interval": interval,
-                "start": start.isoformat(),
-                "end": today.isoformat(),
-                "ingested": 0,
-                "upsert_effect": 0,
-                "status": "no_new_rows",
-            }
-
-        await session.rollback()
-        async with session.begin():
-            effect = await crud_prices.upsert_prices(
-                session,
-                normalized,
-                payload["data"],
-            )
+    last_date = await crud_prices.get_last_date(session, normalized)
+    # Release the connection before the provider download; the upsert opens its own transaction.
+    await session.rollback()
+    if last_date is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Ticker has no stored prices. Ingest a range first.",
+        )
 
-        response = {
-            "ticker": normalized,
-            "interval": interval,
-            "start": start.isoformat(),
-            "end": today.isoformat(),
-            "ingested": payload["count"],
-            "upsert_effect": effect,
-            "status": "ok",
-        }
+    start = last_date + timedelta(days=1)
+    summary = {
+        "ticker": normalized,
+        "interval": interval,
+        "start": start.isoformat(),
+        "end": today.isoformat(),
+    }
+    if start > today:
+        return {**summary, "ingested": 0, "upsert_effect": 0, "status": "up_to_date"}
+    if not np.busday_count(start, today + timedelta(days=1)):
+        # Only weekend days since the last stored bar, so the provider has nothing new.
+        return {**summary, "ingested": 0, "upsert_effect": 0, "status": "no_business_days"}
+
+    payload = await asyncio.to_thread(get_history, normalized, start, today, interval)
+    if payload["count"] == 0 or not payload.get("data"):
+        return {**summary, "ingested": 0, "upsert_effect": 0, "status": "no_new_rows"}
+
+    async with session.begin():
+        effect = await crud_prices.upsert_prices(
+            session,
+            normalized,
+            payload["data"],
+        )
 
-    return response
+    return {**summary, "ingested": payload["count"], "upsert_effect": effect, "status": "ok"}
 
 
 @app.post(
@@ -316,13 +463,15 @@ async def ingest_latest(
     status_code=status.HTTP_201_CREATED,
     summary="Create portfolio",
 )
-async def create_portfolio(payload: PortfolioCreate) -> PortfolioOut:
-    async with session_scope() as session:
-        async with session.begin():
-            try:
-                portfolio = await crud_portfolios.create_portfolio(session, name=payload.name)
-            except PortfolioAlreadyExistsError:
-                raise HTTPException(status_code=409, detail="Portfolio name already exists")
+async def create_portfolio(
+    payload: PortfolioCreate,
+    session: AsyncSession = Depends(get_db_session),
+) -> PortfolioOut:
+    async with session.begin():
+        try:
+            portfolio = await crud_portfolios.create_portfolio(session, name=payload.name)
+        except PortfolioAlreadyExistsError:
+            raise HTTPException(status_code=409, detail="Portfolio name already exists")
     return PortfolioOut.model_validate(portfolio)
 
 
@@ -330,11 +479,10 @@ async def create_portfolio(payload: PortfolioCreate) -> PortfolioOut:
 async def list_portfolios(
     limit: int = Query(100, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_read_session),
 ) -> PortfolioListResponse:
-    async with session_scope() as session:
-        total = await crud_portfolios.count_portfolios(session)
-        portfolios = await crud_portfolios.list_portfolios(session, limit=limit, offset=offset)
-    items = [PortfolioOut.model_validate(p) for p in portfolios]
+    portfolios, total = await crud_portfolios.list_portfolios_with_total(session, limit=limit, offset=offset)
+    items = [_portfolio_out(p) for p in portfolios]
     return PortfolioListResponse(total=total, limit=limit, offset=offset, items=items)
 
 
@@ -343,13 +491,15 @@ async def list_portfolios(
     response_model=PortfolioOut,
     summary="Portfolio detail",
 )
-async def get_portfolio(portfolio_id: UUID = Path(...)) -> PortfolioOut:
-    async with session_scope() as session:
-        try:
-            portfolio = await crud_portfolios.get_portfolio(session, portfolio_id)
-        except PortfolioNotFoundError:
-            raise HTTPException(status_code=404, detail="Portfolio not found")
-    return PortfolioOut.model_validate(portfolio)
+async def get_portfolio(
+    portfolio_id: UUID = Path(...),
+    session: AsyncSession = Depends(get_read_session),
+) -> PortfolioOut:
+    try:
+        portfolio = await crud_portfolios.get_portfolio(session, portfolio_id)
+    except PortfolioNotFoundError:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    return _portfolio_out(portfolio)
 
 
 @app.delete(
@@ -357,13 +507,15 @@ async def get_portfolio(portfolio_id: UUID = Path(...)) -> PortfolioOut:
     status_code=status.HTTP_204_NO_CONTENT,
     summary="Delete portfolio",
 )
-async def delete_portfolio(portfolio_id: UUID = Path(...)) -> Response:
-    async with session_scope() as session:
-        async with session.begin():
-            try:
-                await crud_portfolios.delete_portfolio(session, portfolio_id)
-            except PortfolioNotFoundError:
-                raise HTTPException(status_code=404, detail="Portfolio not found")
+async def delete_portfolio(
+    portfolio_id: UUID = Path(...),
+    session: AsyncSession = Depends(get_db_session),
+) -> Response:
+    async with session.begin():
+        try:
+            await crud_portfolios.delete_portfolio(session, portfolio_id)
+        except PortfolioNotFoundError:
+            raise HTTPException(status_code=404, detail="Portfolio not found")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -376,26 +528,24 @@ async def delete_portfolio(portfolio_id: UUID = Path(...)) -> Response:
 async def create_transaction(
     portfolio_id: UUID,
     payload: TransactionCreate,
+    session: AsyncSession = Depends(get_db_session),
 ) -> TransactionOut:
-    async with session_scope() as session:
-        async with session.begin():
-            try:
-                portfolio = await crud_portfolios.get_portfolio(session, portfolio_id)
-            except PortfolioNotFoundError:
-                raise HTTPException(status_code=404, detail="Portfolio not found")
-            try:
-                transaction = await crud_transactions.create_transaction(
-                    session,
-                    portfolio=portfolio,
-                    ticker=payload.ticker,
-                    tx_type=payload.type,
-                    tx_date=payload.date,
-                    quantity=payload.quantity,
-                    price=payload.price,
-                    amount=payload.amount,
-                )
-            except InvalidTransactionError as exc:
-                raise HTTPException(status_code=400, detail=str(exc))
+    async with session.begin():
+        try:
+            transaction = await crud_transactions.create_transaction(
+                session,
+                portfolio_id=portfolio_id,
+                ticker=payload.ticker,
+                tx_type=payload.type,
+                tx_date=payload.date,
+                quantity=payload.quantity,
+                price=payload.price,
+                amount=payload.amount,
+            )
+        except PortfolioNotFoundError:
+            raise HTTPException(status_code=404, detail="Portfolio not found")
+        except InvalidTransactionError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
     return TransactionOut.model_validate(transaction)
 
 
@@ -411,29 +561,25 @@ async def list_transactions(
     ticker: str | None = Query(None),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    after: UUID | None = Query(None, description="Return transactions after this transaction id (ignores offset)"),
+    session: AsyncSession = Depends(get_read_session),
 ) -> TransactionListResponse:
-    async with session_scope() as session:
-        try:
-            await crud_portfolios.get_portfolio(session, portfolio_id)
-        except PortfolioNotFoundError:
-            raise HTTPException(status_code=404, detail="Portfolio not found")
-        total = await crud_transactions.count_transactions(
-            session,
-            portfolio_id=portfolio_id,
-            start=start,
-            end=end,
-            ticker=ticker,
-        )
-        transactions = await crud_transactions.list_transactions(
-            session,
-            portfolio_id=portfolio_id,
-            start=start,
-            end=end,
-            ticker=ticker,
-            limit=limit,
-            offset=offset,
-        )
-    items = [TransactionOut.model_validate(tx) for tx in transactions]
+    if not await crud_portfolios.portfolio_exists(session, portfolio_id):
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    transactions, total = await crud_transactions.list_transactions_with_total(
+        session,
+        portfolio_id=portfolio_id,
+        start=start,
+        end=end,
+        ticker=ticker,
+        limit=limit,
+        offset=offset,
+        after_id=after,
+    )
+    if len(transactions) >= _OFFLOAD_ROWS:
+        items = await asyncio.to_thread(lambda: [_transaction_out(tx) for tx in transactions])
+    else:
+        items = [_transaction_out(tx) for tx in transactions]
     return TransactionListResponse(total=total, limit=limit, offset=offset, items=items)
 
 
@@ -445,17 +591,17 @@ async def list_transactions(
 async def delete_transaction(
     portfolio_id: UUID,
     transaction_id: UUID,
+    session: AsyncSession = Depends(get_db_session),
 ) -> Response:
-    async with session_scope() as session:
-        async with session.begin():
-            try:
-                await crud_transactions.delete_transaction(
-                    session,
-                    portfolio_id=portfolio_id,
-                    transaction_id=transaction_id,
-                )
-            except TransactionNotFoundError:
-                raise HTTPException(status_code=404, detail="Transaction not found")
+    async with session.begin():
+        try:
+            await crud_transactions.delete_transaction(
+                session,
+                portfolio_id=portfolio_id,
+                transaction_id=transaction_id,
+            )
+        except TransactionNotFoundError:
+            raise HTTPException(status_code=404, detail="Transaction not found")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -464,13 +610,13 @@ async def delete_transaction(
     response_model=List[PositionOut],
     summary="Current positions",
 )
-async def portfolio_positions(portfolio_id: UUID) -> List[PositionOut]:
-    async with session_scope() as session:
-        try:
-            await crud_portfolios.get_portfolio(session, portfolio_id)
-        except PortfolioNotFoundError:
-            raise HTTPException(status_code=404, detail="Portfolio not found")
-        positions = await compute_positions(session, portfolio_id=portfolio_id)
+async def portfolio_positions(
+    portfolio_id: UUID,
+    session: AsyncSession = Depends(get_read_session),
+) -> List[PositionOut]:
+    if not await crud_portfolios.portfolio_exists(session, portfolio_id):
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    positions = await compute_positions(session, portfolio_id=portfolio_id)
     return positions
 
 
@@ -485,20 +631,28 @@ async def portfolio_metrics(
     end: date = Query(..., alias="to"),
     rf: float = Query(0.0),
     mar: float = Query(0.0),
+    session: AsyncSession = Depends(get_db_session),
+    read_session: AsyncSession = Depends(get_read_session),
 ) -> PortfolioMetricsResponse:
     if start > end:
         raise HTTPException(status_code=422, detail="from must be on or before to")
-    async with session_scope() as session:
-        try:
-            await crud_portfolios.get_portfolio(session, portfolio_id)
-        except PortfolioNotFoundError:
-            raise HTTPException(status_code=404, detail="Portfolio not found")
-        metrics = await compute_portfolio_metrics(
+    # The existence check runs on its own connection while the metrics inputs load.
+    exists, metrics = await asyncio.gather(
+        crud_portfolios.portfolio_exists(read_session, portfolio_id),
+        compute_portfolio_metrics(
             session,
             portfolio_id=portfolio_id,
             start=start,
             end=end,
             rf=rf,
             mar=mar,
-        )
+        ),
+        return_exceptions=True,
+    )
+    if isinstance(exists, BaseException):
+        raise exists
+    if not exists:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    if isinstance(metrics, BaseException):
+        raise metrics
     return metrics
@@ -2,13 +2,15 @@ from __future__ import annotations
 
 import datetime as dt
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Literal, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 from .db.models import TransactionType
 
+Interval = Literal["1d", "1wk", "1mo"]
+
 
 class MessageResponse(BaseModel):
     message: str = Field(..., example="Portfolio Manager API running")
@@ -35,7 +37,7 @@ class Candle(BaseModel):
 
 class HistoryResponse(BaseModel):
     ticker: str = Field(..., example="VOO")
-    interval: str = Field(..., pattern="^(1d|1wk|1mo)$", example="1d")
+    interval: Interval = Field(..., example="1d")
     start: str = Field(..., description="YYYY-MM-DD", example="2025-01-01")
     end: Optional[str] = Field(None, description="YYYY-MM-DD", example="2025-09-10")
     count: int = Field(..., example=170)
@@ -1,13 +1,19 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import date
 from typing import Optional
 
 import numpy as np
-import pandas as pd
 from fastapi import HTTPException
 
 from ..market_data import get_history
 
 TRADING_DAYS = 252
+_SQRT_TD = math.sqrt(TRADING_DAYS)
+_INV_TD = 1.0 / TRADING_DAYS
+_BUNDLE_CACHE_SIZE = 256
 
 
 def _round(value: Optional[float], ndigits: int = 6) -> Optional[float]:
@@ -16,47 +22,117 @@ def _round(value: Optional[float], ndigits: int = 6) -> Optional[float]:
     return float(round(float(value), ndigits))
 
 
-def _require_close_column(df: pd.DataFrame) -> None:
-    if "close" not in df.columns:
-        raise HTTPException(status_code=500, detail="close column missing from data")
-
-
 def _ensure_enough_points(ticker: str, count: int) -> None:
     if count < 2:
         raise HTTPException(status_code=404, detail=f"Not enough data for {ticker}")
 
 
-def basic_metrics(ticker: str, start: date, end: Optional[date] = None, rf: float = 0.0) -> dict:
-    """Return annualised return, volatility, Sharpe and max drawdown for a ticker."""
+@dataclass(frozen=True)
+class _ReturnsBundle:
+    dates: list
+    days: np.ndarray
+    close: np.ndarray
+    rets: np.ndarray
+    equity: np.ndarray
+    peak: np.ndarray
+    max_drawdown: float
+
+
+_bundles: "OrderedDict[int, tuple[list, _ReturnsBundle]]" = OrderedDict()
+_bundles_lock = threading.Lock()
+
+
+def _returns_bundle(payload: dict) -> _ReturnsBundle:
+    """Return the close/returns arrays for a ``get_history`` payload.
+
+    Payloads served from the market-data cache share their ``data`` list, so the
+    arrays are reused while that entry lives; a reload yields a new list and a
+    fresh bundle.
+    """
+    data = payload["data"]
+    with _bundles_lock:
+        cached = _bundles.get(id(data))
+        if cached is not None and cached[0] is data:
+            _bundles.move_to_end(id(data))
+            return cached[1]
+
+    try:
+        close = np.array([record["close"] for record in data], dtype=np.float64)
+    except KeyError:
+        raise HTTPException(status_code=500, detail="close column missing from data") from None
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = close[1:] / close[:-1] - 1.0
+    rets = rets[~np.isnan(rets)]
+    equity = np.cumprod(1.0 + rets)
+    peak = np.maximum.accumulate(equity)
+    drawdown = np.divide(equity, peak)
+    drawdown -= 1.0
+    dates = [record.get("date") for record in data]
+    bundle = _ReturnsBundle(
+        dates=dates,
+        days=np.array(dates, dtype="datetime64[D]"),
+        close=close,
+        rets=rets,
+        equity=equity,
+        peak=peak,
+        max_drawdown=float(drawdown.min()) if drawdown.size else 0.0,
+    )
+
+    with _bundles_lock:
+        _bundles[id(data)] = (data, bundle)
+        if len(_bundles) > _BUNDLE_CACHE_SIZE:
+            _bundles.popitem(last=False)
+    return bundle
+
+
+def _prep_returns(ticker: str, start: date, end: Optional[date]) -> tuple[dict, _ReturnsBundle]:
     payload = get_history(ticker, start, end, interval="1d")
     _ensure_enough_points(ticker, payload["count"])
 
-    df = pd.DataFrame(payload["data"])
-    _require_close_column(df)
-
-    df["close"] = df["close"].astype(float)
-    df["ret"] = df["close"].pct_change()
-    rets = df["ret"].dropna()
-    if rets.empty:
+    bundle = _returns_bundle(payload)
+    if not bundle.rets.size:
         raise HTTPException(status_code=404, detail=f"Not enough data for {ticker}")
+    return payload, bundle
 
-    mean_daily = float(rets.mean())
-    std_daily = float(rets.std(ddof=1))
-    ann_return = float((1 + mean_daily) ** TRADING_DAYS - 1)
-    ann_vol = float(std_daily * np.sqrt(TRADING_DAYS))
 
-    if rf != 0.0:
-        rf_daily = (1 + rf) ** (1 / TRADING_DAYS) - 1
-    else:
-        rf_daily = 0.0
-    excess_daily = rets - rf_daily
-    ann_excess = float(excess_daily.mean() * TRADING_DAYS)
+def _compound(rate: float, periods: float) -> float:
+    """``(1 + rate) ** periods - 1`` via log1p/expm1, exact for small rates."""
+    if rate <= -1.0:
+        return (1 + rate) ** periods - 1
+    return math.expm1(periods * math.log1p(rate))
+
+
+def _mean_std(values: np.ndarray) -> tuple[float, float]:
+    """Mean and sample standard deviation from one sum and one sum of squares.
+
+    The values are shifted by their first element so the variance does not suffer
+    from cancellation when the mean dominates the spread.
+    """
+    n = values.size
+    shifted = values - values[0]
+    s1 = float(np.einsum("i->", shifted))
+    s2 = float(np.einsum("i,i->", shifted, shifted))
+    mean = float(values[0]) + s1 / n
+    if n < 2:
+        return mean, float("nan")
+    return mean, math.sqrt(max(s2 - s1 * s1 / n, 0.0) / (n - 1))
+
+
+def _return_stats(bundle: _ReturnsBundle, rf: float) -> tuple[float, float, Optional[float], float]:
+    mean_daily, std_daily = _mean_std(bundle.rets)
+    ann_return = _compound(mean_daily, TRADING_DAYS)
+    ann_vol = float(std_daily * _SQRT_TD)
+
+    rf_daily = _compound(rf, _INV_TD)
+    ann_excess = (mean_daily - rf_daily) * TRADING_DAYS
     sharpe = ann_excess / ann_vol if ann_vol > 0 else None
+    return ann_return, ann_vol, sharpe, bundle.max_drawdown
+
 
-    equity = (1 + rets).cumprod()
-    peak = equity.cummax()
-    drawdown = (equity / peak) - 1.0
-    max_dd = float(drawdown.min()) if not drawdown.empty else 0.0
+def basic_metrics(ticker: str, start: date, end: Optional[date] = None, rf: float = 0.0) -> dict:
+    """Return annualised return, volatility, Sharpe and max drawdown for a ticker."""
+    payload, bundle = _prep_returns(ticker, start, end)
+    ann_return, ann_vol, sharpe, max_dd = _return_stats(bundle, rf)
 
     return {
         "ticker": payload["ticker"],
@@ -79,45 +155,17 @@ def advanced_metrics(
     mar: float = 0.0,
 ) -> dict:
     """Return advanced metrics extending the basic set with downside metrics and YTD."""
-    payload = get_history(ticker, start, end, interval="1d")
-    _ensure_enough_points(ticker, payload["count"])
-
-    df = pd.DataFrame(payload["data"])
-    _require_close_column(df)
-    df["close"] = df["close"].astype(float)
-    df["ret"] = df["close"].pct_change()
-    rets = df["ret"].dropna()
-    if rets.empty:
-        raise HTTPException(status_code=404, detail=f"Not enough data for {ticker}")
-
-    mean_daily = float(rets.mean())
-    std_daily = float(rets.std(ddof=1))
-    ann_return = float((1 + mean_daily) ** TRADING_DAYS - 1)
-    ann_vol = float(std_daily * np.sqrt(TRADING_DAYS))
+    payload, bundle = _prep_returns(ticker, start, end)
+    ann_return, ann_vol, sharpe, max_dd = _return_stats(bundle, rf)
 
-    if rf != 0.0:
-        rf_daily = (1 + rf) ** (1 / TRADING_DAYS) - 1
-    else:
-        rf_daily = 0.0
-    excess_daily = rets - rf_daily
-    ann_excess = float(excess_daily.mean() * TRADING_DAYS)
-    sharpe = ann_excess / ann_vol if ann_vol > 0 else None
-
-    equity = (1 + rets).cumprod()
-    peak = equity.cummax()
-    drawdown = (equity / peak) - 1.0
-    max_dd = float(drawdown.min()) if not drawdown.empty else 0.0
-
-    if mar != 0.0:
-        mar_daily = (1 + mar) ** (1 / TRADING_DAYS) - 1
-    else:
-        mar_daily = 0.0
+    mar_daily = _compound(mar, _INV_TD)
+    rets = bundle.rets
     downside = rets[rets < mar_daily]
-    if downside.empty:
+    if not downside.size:
         downside_vol_daily = 0.0
     else:
-        downside_vol_daily = float(downside.std(ddof=1))
-    downside_vol_ann = downside_vol_daily * np.sqrt(TRADING_DAYS) if downside_vol_daily > 0 else None
+        downside_vol_daily = _mean_std(downside)[1]
+    downside_vol_ann = downside_vol_daily * _SQRT_TD if downside_vol_daily > 0 else None
 
     sortino = None
     if downside_vol_ann and downside_vol_ann > 0:
@@ -127,15 +175,10 @@ def advanced_metrics(
     if max_dd < 0:
         calmar = ann_return / abs(max_dd)
 
-    if payload["end"] is None:
-        end_date = pd.to_datetime(df["date"].iloc[-1]).date()
-    else:
-        end_date = pd.to_datetime(payload["end"]).date()
-    ytd_start = date(end_date.year, 1, 1)
-    df["date"] = pd.to_datetime(df["date"]).dt.date
-    df_ytd = df[df["date"] >= ytd_start]
-    if len(df_ytd) >= 2:
-        ytd_return = float(df_ytd["close"].iloc[-1] / df_ytd["close"].iloc[0] - 1.0)
+    end_year = int(str(payload["end"] if payload["end"] is not None else bundle.dates[-1])[:4])
+    ytd_index = int(np.searchsorted(bundle.days, np.datetime64(f"{end_year:04d}-01-01", "D")))
+    if bundle.close.size - ytd_index >= 2:
+        ytd_return = float(bundle.close[-1] / bundle.close[ytd_index] - 1.0)
     else:
         ytd_return = None
 
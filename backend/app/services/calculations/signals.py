@@ -2,24 +2,42 @@ from datetime import date
 from typing import Optional
 
 import numpy as np
-import pandas as pd
 from fastapi import HTTPException
 
 from ..market_data import get_history
-from .metrics import _round
+from .metrics import _returns_bundle, _round
 
 
-def _rsi(series: pd.Series, period: int = 14) -> Optional[float]:
-    if len(series) < period + 1:
+def _sma(cumulative: np.ndarray, window: int, base: float) -> np.ndarray:
+    """Trailing simple moving average, NaN until ``window`` points are available.
+
+    ``cumulative`` is the running sum of ``closes - base`` with a leading zero;
+    offsetting by the first close keeps the differenced sums small.
+    """
+    sma = np.full(cumulative.size - 1, np.nan)
+    if 0 < window < cumulative.size:
+        sma[window - 1 :] = (cumulative[window:] - cumulative[:-window]) / window + base
+    return sma
+
+
+def _ewm_last(values: np.ndarray, alpha: float) -> float:
+    """Last value of ``ewm(alpha=alpha, adjust=False).mean()`` as one weighted sum."""
+    decay = (1.0 - alpha) ** np.arange(values.size - 1, -1, -1, dtype=np.float64)
+    decay[1:] *= alpha
+    return float(decay @ values)
+
+
+def _rsi(series, period: int = 14) -> Optional[float]:
+    closes = np.asarray(series, dtype=np.float64)
+    if closes.size < period + 1:
+        return None
+    delta = np.diff(closes)
+    alpha = 1 / period
+    avg_gain = _ewm_last(np.maximum(delta, 0.0), alpha)
+    avg_loss = _ewm_last(np.maximum(-delta, 0.0), alpha)
+    if avg_loss == 0 or np.isnan(avg_loss):
         return None
-    delta = series.diff()
-    gain = delta.clip(lower=0.0)
-    loss = -delta.clip(upper=0.0)
-    avg_gain = gain.ewm(alpha=1 / period, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1 / period, adjust=False).mean()
-    rs = avg_gain / avg_loss.replace(0, np.nan)
-    rsi = 100 - (100 / (1 + rs))
-    value = float(rsi.iloc[-1])
+    value = 100 - (100 / (1 + avg_gain / avg_loss))
     if np.isnan(value):
         return None
     return value
@@ -42,31 +60,30 @@ def tech_signals(
             detail=f"Not enough data for {ticker}; need at least {minimum_required} points",
         )
 
-    df = pd.DataFrame(payload["data"])
-    if "close" not in df.columns:
-        raise HTTPException(status_code=500, detail="close column missing from data")
-
-    closes = df["close"].astype(float)
+    bundle = _returns_bundle(payload)
+    closes = bundle.close
 
-    momentum = float(closes.pct_change(window).iloc[-1])
+    momentum = float(closes[-1] / closes[-1 - window] - 1.0)
 
-    sma_fast_series = closes.rolling(fast).mean()
-    sma_slow_series = closes.rolling(slow).mean()
-    sma_fast = float(sma_fast_series.iloc[-1])
-    sma_slow = float(sma_slow_series.iloc[-1])
+    base = float(closes[0])
+    cumulative = np.concatenate(([0.0], np.cumsum(closes - base)))
+    sma_fast_series = _sma(cumulative, fast, base)
+    sma_slow_series = _sma(cumulative, slow, base)
+    sma_fast = float(sma_fast_series[-1])
+    sma_slow = float(sma_slow_series[-1])
 
     cross_now = bool(sma_fast > sma_slow)
 
-    cross_flag = (sma_fast_series > sma_slow_series).astype(int)
-    cross_change = cross_flag.diff()
-    last_change = cross_change.dropna()
-    if last_change.empty or (last_change != 0).sum() == 0:
+    # NaN comparisons are False, so the warm-up period counts as "below".
+    above = sma_fast_series > sma_slow_series
+    changes = np.flatnonzero(above[1:] != above[:-1])
+    if not changes.size:
         last_cross_date = None
         last_cross_type = None
     else:
-        idx_last = last_change[last_change != 0].index[-1]
-        last_cross_date = str(df.loc[idx_last, "date"]) if "date" in df.columns else str(idx_last.date())
-        last_cross_type = "golden" if last_change.loc[idx_last] > 0 else "death"
+        idx_last = int(changes[-1]) + 1
+        last_cross_date = str(bundle.dates[idx_last])
+        last_cross_type = "golden" if above[idx_last] else "death"
 
     rsi_value = _rsi(closes, rsi_period)
 
@@ -75,7 +92,7 @@ def tech_signals(
         "start": payload["start"],
         "end": payload["end"],
         "count": int(payload["count"]),
-        "price": _round(closes.iloc[-1]),
+        "price": _round(closes[-1]),
         "momentum_window": int(window),
         "momentum": _round(momentum),
         "sma_fast_window": int(fast),
@@ -1,10 +1,80 @@
 import math
+import threading
+import time
+from collections import OrderedDict
 from datetime import date
-from typing import Optional
+from typing import Callable, Dict, Hashable, Optional, Sequence
 
 from fastapi import HTTPException
+import numpy as np
+import pandas as pd
 import yfinance as yf
 
+CACHE_MAXSIZE = 2048
+LAST_CLOSE_TTL = 60.0
+OPEN_RANGE_TTL = 300.0
+CLOSED_RANGE_TTL = 24 * 60 * 60.0
+
+
+class _TTLCache:
+    """Thread-safe LRU with per-entry expiry; concurrent misses on one key share a single load."""
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: dict[Hashable, threading.Lock] = {}
+
+    def _get(self, key: Hashable) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def peek(self, key: Hashable) -> Optional[dict]:
+        return self._get(key)
+
+    def put(self, key: Hashable, ttl: float, value: dict) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, ttl: float, loader: Callable[[], dict]) -> dict:
+        value = self._get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                value = self._get(key)
+                if value is None:
+                    value = loader()
+                    self.put(key, ttl, value)
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_cache = _TTLCache(CACHE_MAXSIZE)
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
 
 def _safe_float(value: object) -> Optional[float]:
     try:
@@ -16,14 +86,13 @@ def _safe_float(value: object) -> Optional[float]:
     return round(result, 6)
 
 
-def _safe_int(value: object) -> Optional[int]:
-    try:
-        as_float = float(value)
-    except (TypeError, ValueError):
-        return None
-    if math.isnan(as_float):
-        return None
-    return int(as_float)
+def _rounded_column(df, key: str) -> np.ndarray:
+    values = pd.to_numeric(df[key], errors="coerce").to_numpy(dtype=np.float64)
+    return np.round(values, 6)
+
+
+def _optional_floats(values: np.ndarray) -> list:
+    return [None if math.isnan(value) else value for value in values.tolist()]
 
 
 def _normalize_index(df) -> None:
@@ -32,7 +101,64 @@ def _normalize_index(df) -> None:
 
 
 def get_last_close(ticker: str) -> dict:
-    """Return the latest adjusted close for the given ticker."""
+    """Return the latest adjusted close for the given ticker, cached for ``LAST_CLOSE_TTL`` seconds."""
+    key = ("last", ticker.upper())
+    return dict(_cache.get_or_load(key, LAST_CLOSE_TTL, lambda: _download_last_close(ticker)))
+
+
+def get_history(ticker: str, start: date, end: Optional[date] = None, interval: str = "1d") -> dict:
+    """Return OHLCV candles for the range; ranges that ended before today are cached longer."""
+    if end is not None and start > end:
+        raise HTTPException(status_code=422, detail="start must be on or before end")
+
+    key = _history_key(ticker, start, end, interval)
+    return dict(_cache.get_or_load(key, _history_ttl(end), lambda: _download_history(ticker, start, end, interval)))
+
+
+def get_history_batch(
+    tickers: Sequence[str],
+    start: date,
+    end: Optional[date] = None,
+    interval: str = "1d",
+) -> Dict[str, dict]:
+    """Return ``get_history`` payloads keyed by upper-cased ticker, downloading all cache misses at once.
+
+    Tickers the provider has no usable candles for are left out of the result.
+    """
+    if end is not None and start > end:
+        raise HTTPException(status_code=422, detail="start must be on or before end")
+
+    results: Dict[str, dict] = {}
+    missing: list[str] = []
+    for ticker in dict.fromkeys(ticker.upper() for ticker in tickers if ticker):
+        cached = _cache.peek(_history_key(ticker, start, end, interval))
+        if cached is not None:
+            results[ticker] = dict(cached)
+        else:
+            missing.append(ticker)
+    if not missing:
+        return results
+
+    df = _download_frame(" ".join(missing), start, end, interval)
+    for ticker in missing:
+        try:
+            payload = _history_payload(df, ticker, start, end, interval)
+        except HTTPException:
+            continue
+        _cache.put(_history_key(ticker, start, end, interval), _history_ttl(end), payload)
+        results[ticker] = dict(payload)
+    return results
+
+
+def _history_key(ticker: str, start: date, end: Optional[date], interval: str) -> tuple:
+    return ("history", ticker.upper(), start, end, interval)
+
+
+def _history_ttl(end: Optional[date]) -> float:
+    return CLOSED_RANGE_TTL if end is not None and end < date.today() else OPEN_RANGE_TTL
+
+
+def _download_last_close(ticker: str) -> dict:
     try:
         df = yf.download(
             tickers=ticker,
@@ -67,13 +193,10 @@ def get_last_close(ticker: str) -> dict:
     }
 
 
-def get_history(ticker: str, start: date, end: Optional[date] = None, interval: str = "1d") -> dict:
-    if end is not None and start > end:
-        raise HTTPException(status_code=422, detail="start must be on or before end")
-
+def _download_frame(tickers: str, start: date, end: Optional[date], interval: str):
     try:
-        df = yf.download(
-            tickers=ticker,
+        return yf.download(
+            tickers=tickers,
             start=start.isoformat(),
             end=None if end is None else end.isoformat(),
             interval=interval,
@@ -84,6 +207,22 @@ def get_history(ticker: str, start: date, end: Optional[date] = None, interval:
     except Exception as exc:  # pragma: no cover - upstream failure
         raise HTTPException(status_code=502, detail=f"Error downloading data: {exc}") from exc
 
+
+def _download_history(ticker: str, start: date, end: Optional[date], interval: str) -> dict:
+    return _history_payload(_download_frame(ticker, start, end, interval), ticker, start, end, interval)
+
+
+def _ticker_frame(df, ticker: str):
+    """Slice one ticker out of a multi-ticker download (columns keyed ``(field, ticker)``)."""
+    if df is None or not isinstance(df.columns, pd.MultiIndex):
+        return df
+    if ticker.upper() not in df.columns.get_level_values(1):
+        return None
+    return df.xs(ticker.upper(), axis=1, level=1)
+
+
+def _history_payload(df, ticker: str, start: date, end: Optional[date], interval: str) -> dict:
+    df = _ticker_frame(df, ticker)
     if df is None or df.empty:
         raise HTTPException(status_code=404, detail=f"No data for {ticker} in the requested range")
 
@@ -103,27 +242,23 @@ def get_history(ticker: str, start: date, end: Optional[date] = None, interval:
     if close_key is None:
         raise HTTPException(status_code=500, detail="close column missing from provider response")
 
-    records = []
-    for idx, row in df.iterrows():
-        item = {"date": idx.date().isoformat()}
-
-        close_value = _safe_float(row.get(close_key))
-        if close_value is None:
-            continue
-
-        item["close"] = close_value
-
-        if open_key and high_key and low_key:
-            item["open"] = _safe_float(row.get(open_key))
-            item["high"] = _safe_float(row.get(high_key))
-            item["low"] = _safe_float(row.get(low_key))
-
-        if volume_key:
-            item["volume"] = _safe_int(row.get(volume_key))
-        else:
-            item["volume"] = None
+    closes = _rounded_column(df, close_key)
+    keep = ~np.isnan(closes)
+    fields = {
+        "date": df.index[keep].strftime("%Y-%m-%d").tolist(),
+        "close": closes[keep].tolist(),
+    }
+    if open_key and high_key and low_key:
+        for name, key in (("open", open_key), ("high", high_key), ("low", low_key)):
+            fields[name] = _optional_floats(_rounded_column(df, key)[keep])
+    if volume_key:
+        volumes = pd.to_numeric(df[volume_key], errors="coerce").to_numpy(dtype=np.float64)[keep]
+        fields["volume"] = [None if math.isnan(value) else int(value) for value in volumes.tolist()]
+    else:
+        fields["volume"] = [None] * len(fields["close"])
 
-        records.append(item)
+    names = tuple(fields)
+    records = [dict(zip(names, values)) for values in zip(*fields.values())]
 
     if not records:
         raise HTTPException(status_code=404, detail=f"No data for {ticker} in the requested range")
@@ -3,7 +3,7 @@ from __future__ import annotations
 import asyncio
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, List, Sequence
+from typing import Dict, List, NamedTuple, Sequence
 from uuid import UUID
 
 import numpy as np
@@ -11,20 +11,20 @@ import pandas as pd
 from fastapi import HTTPException
 
 from ..db.crud_prices import get_latest_prices_for, load_price_history_for_tickers
-from ..db.crud_transactions import aggregate_positions, get_all_transactions
-from ..db.models import Transaction, TransactionType
+from ..db.crud_transactions import aggregate_positions, load_quantity_deltas
 from ..schemas import PositionOut, PortfolioMetricsResponse
-from .market_data import get_history, get_last_close
+from .market_data import get_history_batch, get_last_close
 
 _PRICE_QUANT = Decimal("0.0001")
 _VALUE_QUANT = Decimal("0.01")
 _QTY_QUANT = Decimal("0.00000001")
 
 
-def _quantize(value: Decimal | None, quantum: Decimal) -> Decimal | None:
+def _quantize_float(value: float | None, quantum: Decimal) -> Decimal | None:
+    # Ten decimals absorb binary float noise before the half-up rounding step.
     if value is None:
         return None
-    return value.quantize(quantum, rounding=ROUND_HALF_UP)
+    return Decimal(f"{value:.10f}").quantize(quantum, rounding=ROUND_HALF_UP)
 
 
 def _decimal_from(value) -> Decimal:
@@ -52,42 +52,46 @@ async def compute_positions(
     db_prices = await get_latest_prices_for(session, tickers)
     missing = [ticker for ticker in tickers if ticker not in db_prices or db_prices[ticker].close is None]
 
-    fallback_prices: Dict[str, Decimal] = {}
+    fallback_prices: Dict[str, float] = {}
     if missing:
-        for ticker in missing:
-            try:
-                payload = await asyncio.to_thread(get_last_close, ticker)
-            except HTTPException:
+        payloads = await asyncio.gather(
+            *(asyncio.to_thread(get_last_close, ticker) for ticker in missing),
+            return_exceptions=True,
+        )
+        for ticker, payload in zip(missing, payloads):
+            if isinstance(payload, HTTPException):
                 continue
-            fallback_prices[ticker] = Decimal(str(payload["close"]))
+            if isinstance(payload, BaseException):
+                raise payload
+            fallback_prices[ticker] = float(payload["close"])
 
     results: List[PositionOut] = []
     for row in filtered:
         ticker = row["ticker"]
         quantity = _decimal_from(row.get("quantity")).quantize(_QTY_QUANT, rounding=ROUND_HALF_UP)
-        cost = _decimal_from(row.get("cost"))
-        avg_cost = cost / quantity if quantity != 0 else None
+        qty = float(quantity)
+        avg_cost = float(row.get("cost") or 0) / qty if qty != 0 else None
 
         price_record = db_prices.get(ticker)
         market_price = None
         if price_record and price_record.close is not None:
-            market_price = _decimal_from(price_record.close)
+            market_price = float(price_record.close)
         elif ticker in fallback_prices:
             market_price = fallback_prices[ticker]
 
-        market_value = (market_price * quantity) if market_price is not None else Decimal(0)
-        unrealized = Decimal(0)
+        market_value = market_price * qty if market_price is not None else 0.0
+        unrealized = 0.0
         if market_price is not None and avg_cost is not None:
-            unrealized = (market_price - avg_cost) * quantity
+            unrealized = (market_price - avg_cost) * qty
 
         results.append(
             PositionOut(
                 ticker=ticker,
-                quantity=_quantize(quantity, _QTY_QUANT),
-                avg_cost=_quantize(avg_cost, _PRICE_QUANT) if avg_cost is not None else None,
-                market_price=_quantize(market_price, _PRICE_QUANT) if market_price is not None else None,
-                market_value=_quantize(market_value, _VALUE_QUANT),
-                unrealized_pnl=_quantize(unrealized, _VALUE_QUANT),
+                quantity=quantity,
+                avg_cost=_quantize_float(avg_cost, _PRICE_QUANT),
+                market_price=_quantize_float(market_price, _PRICE_QUANT),
+                market_value=_quantize_float(market_value, _VALUE_QUANT),
+                unrealized_pnl=_quantize_float(unrealized, _VALUE_QUANT),
             )
         )
 
@@ -101,66 +105,138 @@ async def _ensure_price_history(
     end: date,
     db_prices: Dict[str, list],
 ) -> pd.DataFrame:
-    rows: List[dict] = []
+    names: List[str] = []
+    dates: List[np.ndarray] = []
+    closes: List[np.ndarray] = []
     missing: List[str] = []
     for ticker in tickers:
         items = db_prices.get(ticker, [])
         if not items:
             missing.append(ticker)
             continue
-        for price in items:
-            if price.close is None:
-                continue
-            rows.append({"date": pd.Timestamp(price.date), "ticker": ticker, "close": float(price.close)})
+        priced = [price for price in items if price.close is not None]
+        names.append(ticker)
+        dates.append(np.array([price.date for price in priced], dtype="datetime64[D]"))
+        closes.append(np.array([float(price.close) for price in priced], dtype=np.float64))
 
-    for ticker in missing:
+    if missing:
         try:
-            payload = await asyncio.to_thread(get_history, ticker, start, end, "1d")
+            payloads = await asyncio.to_thread(get_history_batch, missing, start, end, "1d")
         except HTTPException as exc:
-            raise HTTPException(status_code=400, detail=f"Missing price data for {ticker}: {exc.detail}") from exc
-        for item in payload.get("data", []):
-            rows.append({"date": pd.Timestamp(item["date"]), "ticker": ticker, "close": float(item["close"])})
-
-    price_df = pd.DataFrame(rows)
-    if price_df.empty:
+            detail = f"Missing price data for {', '.join(missing)}: {exc.detail}"
+            raise HTTPException(status_code=400, detail=detail) from exc
+        for ticker in missing:
+            payload = payloads.get(ticker.upper())
+            if payload is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Missing price data for {ticker}: No data for {ticker} in the requested range",
+                )
+            data = payload.get("data", [])
+            names.append(ticker)
+            dates.append(np.array([item["date"] for item in data], dtype="datetime64[D]"))
+            closes.append(np.array([item["close"] for item in data], dtype=np.float64))
+
+    if not any(values.size for values in closes):
         raise HTTPException(status_code=400, detail="No price data available for requested portfolio.")
-    return price_df
-
-
-def _timeseries_positions(transactions: List[Transaction], tickers: Sequence[str], date_index: pd.DatetimeIndex) -> pd.DataFrame:
-    records: List[dict] = []
-    for tx in transactions:
-        if tx.type in {TransactionType.BUY, TransactionType.SELL}:
-            qty = float(tx.quantity or 0)
-            if tx.type == TransactionType.SELL:
-                qty *= -1
-            if qty != 0:
-                records.append({"date": pd.Timestamp(tx.date), "ticker": tx.ticker, "qty_delta": qty})
-
-    if records:
-        qty_df = pd.DataFrame(records)
-        qty_pivot = qty_df.pivot_table(index="date", columns="ticker", values="qty_delta", aggfunc="sum", fill_value=0.0)
-    else:
-        qty_pivot = pd.DataFrame(0.0, index=pd.DatetimeIndex([], name="date"), columns=tickers)
-
-    qty_pivot = qty_pivot.reindex(date_index, fill_value=0.0)
-    qty_pivot = qty_pivot.reindex(columns=tickers, fill_value=0.0)
-    return qty_pivot.cumsum()
-
-
-def _compute_returns(values: pd.Series, start: date) -> np.ndarray:
-    returns: List[float] = []
-    for idx in range(1, len(values)):
-        prev_date = values.index[idx - 1]
-        current_date = values.index[idx]
-        if prev_date.date() < start:
-            continue
-        prev_value = values.iloc[idx - 1]
-        current_value = values.iloc[idx]
-        if prev_value <= 0:
+    return _price_matrix(names, dates, closes, tickers, _trading_days(start, end, dates))
+
+
+def _trading_days(start: date, end: date, price_dates: Sequence[np.ndarray]) -> pd.DatetimeIndex:
+    # Business days, plus any other day in range that actually carries a close.
+    days = pd.bdate_range(start, end).values.astype("datetime64[D]")
+    observed = np.concatenate(price_dates)
+    observed = observed[(observed >= np.datetime64(start, "D")) & (observed <= np.datetime64(end, "D"))]
+    return pd.DatetimeIndex(np.union1d(days, observed).astype("datetime64[ns]"))
+
+
+def _timeseries_positions(
+    tx_dates: np.ndarray,
+    tx_tickers: Sequence[str],
+    qty_deltas: np.ndarray,
+    tickers: Sequence[str],
+    date_index: pd.DatetimeIndex,
+) -> pd.DataFrame:
+    deltas = np.zeros((len(date_index), len(tickers)), dtype=np.float64)
+    if tx_dates.size:
+        days = date_index.values.astype("datetime64[D]")
+        rows = np.searchsorted(days, tx_dates)
+        cols = pd.Categorical(tx_tickers, categories=tickers).codes
+        # Transactions on days without a close take effect on the next day in the index.
+        valid = (cols >= 0) & (rows < len(days))
+        np.add.at(deltas, (rows[valid], cols[valid]), qty_deltas[valid])
+    return pd.DataFrame(np.cumsum(deltas, axis=0), index=date_index, columns=list(tickers))
+
+
+def _price_matrix(
+    names: Sequence[str],
+    dates: Sequence[np.ndarray],
+    closes: Sequence[np.ndarray],
+    tickers: Sequence[str],
+    date_index: pd.DatetimeIndex,
+) -> pd.DataFrame:
+    """Forward-filled ``(day, ticker)`` close matrix; days before a ticker's first price stay NaN."""
+    matrix = np.full((len(date_index), len(tickers)), np.nan)
+    days = date_index.values.astype("datetime64[D]")
+    columns = {ticker: col for col, ticker in enumerate(tickers)}
+    for name, ticker_dates, ticker_closes in zip(names, dates, closes):
+        col = columns.get(name)
+        if col is None or not ticker_dates.size:
             continue
-        returns.append((current_value / prev_value) - 1.0)
-    return np.array(returns, dtype=float)
+        rows = np.searchsorted(days, ticker_dates)
+        valid = rows < len(days)
+        valid[valid] &= days[rows[valid]] == ticker_dates[valid]
+        matrix[rows[valid], col] = ticker_closes[valid]
+
+    # Forward fill: carry each column's last observed row index down, then gather.
+    last_seen = np.where(np.isnan(matrix), 0, np.arange(len(date_index))[:, None])
+    np.maximum.accumulate(last_seen, axis=0, out=last_seen)
+    filled = matrix[last_seen, np.arange(len(tickers))]
+    return pd.DataFrame(filled, index=date_index, columns=list(tickers))
+
+
+def _compute_returns(values: np.ndarray, first: int) -> np.ndarray:
+    prev = values[first:-1]
+    curr = values[first + 1 :]
+    mask = prev > 0
+    return curr[mask] / prev[mask] - 1.0
+
+
+class _PortfolioStats(NamedTuple):
+    total_growth: float
+    mean_daily: float
+    std_daily: float
+    downside_std: float
+    max_drawdown: float
+
+
+def _portfolio_stats(values: np.ndarray, returns: np.ndarray, mar_daily: float) -> _PortfolioStats:
+    n = returns.size
+    mean_daily = float(returns.mean())
+    centered = returns - mean_daily
+    std_daily = float(np.sqrt(np.dot(centered, centered) / n))
+
+    # Only returns strictly below the MAR contribute, and the mean is over those days.
+    shortfall = np.minimum(returns - mar_daily, 0.0)
+    downside_days = np.count_nonzero(shortfall)
+    downside_std = float(np.sqrt(np.dot(shortfall, shortfall) / downside_days)) if downside_days else 0.0
+
+    peak = np.maximum.accumulate(values)
+    ratio = np.divide(values, peak, out=np.ones_like(values), where=peak > 0)
+    max_drawdown = float(ratio.min()) - 1.0 if ratio.size else 0.0
+
+    # Summing logs does not underflow on long histories; a -100% (or worse) day yields 0 or NaN,
+    # which the caller treats like the non-positive product it replaces.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total_growth = float(np.exp(np.log1p(returns).sum()))
+
+    return _PortfolioStats(
+        total_growth=total_growth,
+        mean_daily=mean_daily,
+        std_daily=std_daily,
+        downside_std=downside_std,
+        max_drawdown=max_drawdown,
+    )
 
 
 async def compute_portfolio_metrics(
@@ -175,25 +251,24 @@ async def compute_portfolio_metrics(
     if start > end:
         raise HTTPException(status_code=400, detail="start must be before or equal to end")
 
-    transactions = await get_all_transactions(session, portfolio_id=portfolio_id, up_to=end)
-    if not transactions:
+    rows = await load_quantity_deltas(session, portfolio_id=portfolio_id, up_to=end)
+    if not rows:
         raise HTTPException(status_code=400, detail="Portfolio has no transactions in the requested range")
 
-    tickers = sorted({tx.ticker for tx in transactions})
+    first_tx_date = rows[0].date
+    tx_tickers = [row.ticker for row in rows]
+    tx_dates = np.array([row.date for row in rows], dtype="datetime64[D]")
+    # Dividends, fees and cash movements carry a zero signed quantity.
+    qty_deltas = np.nan_to_num(np.array([row.signed_quantity for row in rows], dtype=np.float64))
+
+    tickers = sorted(set(tx_tickers))
     if not tickers:
         raise HTTPException(status_code=400, detail="Portfolio has no equity transactions")
 
-    first_tx_date = min(tx.date for tx in transactions)
     effective_start = min(first_tx_date, start)
-    date_index = pd.date_range(effective_start, end, freq="D")
-
-    positions = _timeseries_positions(transactions, tickers, date_index)
-
     price_records = await load_price_history_for_tickers(session, tickers, effective_start, end)
-    price_df = await _ensure_price_history(tickers, effective_start, end, price_records)
-    prices = price_df.pivot_table(index="date", columns="ticker", values="close", aggfunc="last")
-    prices = prices.sort_index().reindex(date_index)
-    prices = prices.ffill().reindex(columns=tickers)
+    prices = await _ensure_price_history(tickers, effective_start, end, price_records)
+    positions = _timeseries_positions(tx_dates, tx_tickers, qty_deltas, tickers, prices.index)
 
     valid_columns = [col for col in prices.columns if prices[col].notna().any()]
     if not valid_columns:
@@ -208,11 +283,16 @@ async def compute_portfolio_metrics(
     positions = positions[active_tickers]
     prices = prices[active_tickers]
 
-    values = (positions * prices).sum(axis=1).fillna(0.0)
-    if values.loc[start:].le(0).all():
+    # Days before a ticker's first price contribute nothing, as NaN-skipping sum() did.
+    # pandas hands back column-major blocks; the per-day products want rows contiguous.
+    price_values = np.nan_to_num(np.ascontiguousarray(prices.to_numpy(dtype=np.float64)), nan=0.0)
+    position_values = np.ascontiguousarray(positions.to_numpy(dtype=np.float64))
+    values = np.einsum("nk,nk->n", position_values, price_values)
+    first = int(np.searchsorted(positions.index.values, np.datetime64(start, "ns")))
+    if (values[first:] <= 0).all():
         raise HTTPException(status_code=400, detail="Portfolio value is zero throughout the selected period")
 
-    returns = _compute_returns(values, start)
+    returns = _compute_returns(values, first)
     n_days = returns.size
     if n_days == 0:
         raise HTTPException(status_code=400, detail="Not enough observations to compute metrics")
@@ -220,34 +300,22 @@ async def compute_portfolio_metrics(
     rf_daily = (1 + rf) ** (1 / 252) - 1
     mar_daily = (1 + mar) ** (1 / 252) - 1
 
-    total_growth = float(np.prod(returns + 1.0))
-    ann_return = total_growth ** (252 / n_days) - 1 if total_growth > 0 else None
+    stats = _portfolio_stats(values, returns, mar_daily)
 
-    std_daily = float(np.std(returns, ddof=0))
-    ann_volatility = std_daily * np.sqrt(252) if std_daily > 0 else None
+    ann_return = stats.total_growth ** (252 / n_days) - 1 if stats.total_growth > 0 else None
+    ann_volatility = stats.std_daily * np.sqrt(252) if stats.std_daily > 0 else None
 
     sharpe = None
-    if std_daily > 0:
-        mean_daily = float(np.mean(returns))
-        sharpe = ((mean_daily - rf_daily) / std_daily) * np.sqrt(252)
-
-    downside_mask = returns < mar_daily
-    if downside_mask.any():
-        downside_diff = returns[downside_mask] - mar_daily
-        downside_std = float(np.sqrt(np.mean(downside_diff ** 2)))
-    else:
-        downside_std = 0.0
-    downside_volatility = downside_std * np.sqrt(252) if downside_std > 0 else None
+    if stats.std_daily > 0:
+        sharpe = ((stats.mean_daily - rf_daily) / stats.std_daily) * np.sqrt(252)
+
+    downside_volatility = stats.downside_std * np.sqrt(252) if stats.downside_std > 0 else None
 
     sortino = None
     if downside_volatility and downside_volatility > 0 and ann_return is not None:
         sortino = (ann_return - mar) / downside_volatility
 
-    values_array = values.values.astype(float)
-    cummax = np.maximum.accumulate(values_array)
-    drawdowns = np.where(cummax > 0, (values_array / cummax) - 1.0, 0.0)
-    max_drawdown = float(drawdowns.min()) if drawdowns.size else 0.0
-
+    max_drawdown = stats.max_drawdown
     calmar = None
     if max_drawdown < 0 and ann_return is not None:
         calmar = ann_return / abs(max_drawdown)
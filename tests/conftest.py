@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import sys
+import weakref
 from pathlib import Path
 
 import pytest
@@ -15,16 +16,36 @@ if str(ROOT_DIR) not in sys.path:
 from backend.app.db.base import Base
 from backend.app.db.session import configure_engine, get_engine, get_sessionmaker
 from backend.app.main import app
+from backend.app.services import market_data
 
 
-@pytest_asyncio.fixture(scope="session")
-async def setup_test_db(tmp_path_factory: pytest.TempPathFactory):
-    db_dir = tmp_path_factory.mktemp("db")
-    db_path = db_dir / "test.db"
-    configure_engine(f"sqlite+aiosqlite:///{db_path}")
-    engine = get_engine()
+@pytest.fixture(autouse=True)
+def clear_market_data_cache():
+    market_data.clear_cache()
+    yield
+    market_data.clear_cache()
+
+
+TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+# Engines that already carry the schema, so create_all runs once per engine, not per test.
+_schema_engines: weakref.WeakSet = weakref.WeakSet()
+
+
+async def _ensure_schema(engine) -> None:
+    if engine in _schema_engines:
+        return
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    _schema_engines.add(engine)
+
+
+@pytest_asyncio.fixture(scope="session")
+async def setup_test_db():
+    # aiosqlite serves :memory: URLs from a StaticPool, so every session shares one
+    # connection and the schema only has to be created once.
+    configure_engine(TEST_DATABASE_URL)
+    engine = get_engine()
+    await _ensure_schema(engine)
     yield
     await engine.dispose()
 
@@ -32,9 +53,9 @@ async def setup_test_db(tmp_path_factory: pytest.TempPathFactory):
 @pytest_asyncio.fixture(autouse=True)
 async def clean_database(setup_test_db):
     engine = get_engine()
+    # Another test may have reconfigured the engine onto a database without tables.
+    await _ensure_schema(engine)
     async with engine.begin() as conn:
-        # Ensure tables exist in case another test reconfigured the engine
-        await conn.run_sync(Base.metadata.create_all)
         for table in reversed(Base.metadata.sorted_tables):
             await conn.execute(table.delete())
 
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import json
 from datetime import date, timedelta
 
 import pytest
+from httpx import ASGITransport, AsyncClient
 from sqlalchemy import select
 
 from backend.app.db.models import Price
+from backend.app.main import ConditionalMarketDataMiddleware
 
 
 @pytest.mark.asyncio
@@ -98,7 +101,8 @@ async def test_ingest_latest_flow(client, db_session, monkeypatch):
     assert response.status_code == 404
 
     today = date.today()
-    last_date = today - timedelta(days=2)
+    # Leave a four-day gap so the window always contains at least one weekday.
+    last_date = today - timedelta(days=4)
 
     async with db_session.begin():
         db_session.add(
@@ -156,3 +160,136 @@ async def test_ingest_latest_flow(client, db_session, monkeypatch):
     assert rows[-1].date == last_date + timedelta(days=1)
     assert float(rows[-1].close) == pytest.approx(101.5)
 
+
+
+@pytest.mark.asyncio
+async def test_ingest_latest_rejects_unknown_interval(client):
+    response = await client.post("/ingest/VOO/latest", params={"interval": "5m"})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_db_price_range_ndjson_streams_rows(client, db_session):
+    async with db_session.begin():
+        db_session.add_all([
+            Price(id=10 + day, ticker="IWM", date=date(2025, 3, day), close=200.0 + day, volume=day)
+            for day in range(1, 4)
+        ])
+
+    response = await client.get("/prices/iwm/db/range.ndjson", params={"start": "2025-03-02"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [
+        {"date": "2025-03-02", "open": None, "high": None, "low": None, "close": 202.0, "volume": 2},
+        {"date": "2025-03-03", "open": None, "high": None, "low": None, "close": 203.0, "volume": 3},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_portfolio_metrics_unknown_portfolio_returns_404(client):
+    response = await client.get(
+        "/portfolios/00000000-0000-0000-0000-000000000000/metrics",
+        params={"from": "2025-01-01", "to": "2025-01-31"},
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Portfolio not found"
+
+
+@pytest.mark.asyncio
+async def test_last_price_supports_conditional_get(client, monkeypatch):
+    monkeypatch.setattr(
+        "backend.app.main.get_last_close",
+        lambda ticker: {"ticker": ticker.upper(), "date": "2025-03-03", "close": 101.5},
+    )
+
+    first = await client.get("/prices/voo/last")
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, max-age=60"
+    etag = first.headers["etag"]
+
+    cached = await client.get("/prices/voo/last", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    db_read = await client.get("/prices/voo/db/last")
+    assert "etag" not in db_read.headers
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_keeps_repeated_headers_and_chunked_bodies():
+    async def chunked_app(scope, receive, send):
+        headers = [(b"set-cookie", b"a=1"), (b"set-cookie", b"b=2")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"{\"close\":", "more_body": True})
+        await send({"type": "http.response.body", "body": b"1}"})
+
+    transport = ASGITransport(app=ConditionalMarketDataMiddleware(chunked_app))
+    async with AsyncClient(transport=transport, base_url="http://test") as raw_client:
+        cached = await raw_client.get("/prices/voo/range")
+        uncached = await raw_client.get("/portfolios")
+
+    assert cached.content == b'{"close":1}'
+    assert cached.headers["content-length"] == "11"
+    assert cached.headers.get_list("set-cookie") == ["a=1", "b=2"]
+    assert cached.headers["cache-control"] == "public, max-age=3600"
+    assert "etag" not in uncached.headers
+    assert uncached.headers.get_list("set-cookie") == ["a=1", "b=2"]
+
+
+@pytest.mark.asyncio
+async def test_create_transaction_unknown_portfolio_returns_404(client):
+    response = await client.post(
+        "/portfolios/00000000-0000-0000-0000-000000000000/transactions",
+        json={"ticker": "VOO", "date": "2025-01-02", "type": "BUY", "quantity": "1", "price": "100"},
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Portfolio not found"
+
+
+@pytest.mark.asyncio
+async def test_ingest_latest_skips_weekend_only_gap(client, db_session, monkeypatch):
+    class _Sunday(date):
+        @classmethod
+        def today(cls) -> date:
+            return date(2025, 3, 9)
+
+    async with db_session.begin():
+        db_session.add(Price(id=1, ticker="VOO", date=date(2025, 3, 7), close=100.0))
+
+    def fail_get_history(*_args, **_kwargs) -> dict:  # pragma: no cover - must not be called
+        raise AssertionError("provider should not be called for a weekend-only gap")
+
+    monkeypatch.setattr("backend.app.main.date", _Sunday)
+    monkeypatch.setattr("backend.app.main.get_history", fail_get_history)
+
+    response = await client.post("/ingest/VOO/latest")
+    assert response.status_code == 200
+    assert response.json() == {
+        "ticker": "VOO",
+        "interval": "1d",
+        "start": "2025-03-08",
+        "end": "2025-03-09",
+        "ingested": 0,
+        "upsert_effect": 0,
+        "status": "no_business_days",
+    }
+
+
+@pytest.mark.asyncio
+async def test_lifespan_starts_when_database_is_unreachable(monkeypatch):
+    from backend.app import main
+
+    async def _refuse():
+        raise ConnectionRefusedError("connection refused")
+
+    async def _noop():
+        return None
+
+    monkeypatch.setattr(main, "warm_pool", _refuse)
+    monkeypatch.setattr(main, "dispose_engine", _noop)
+
+    async with main.lifespan(main.app):
+        pass
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 from datetime import date, timedelta
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
 
 import numpy as np
 import pytest
@@ -8,26 +11,28 @@ import pytest
 from backend.app.services.calculations.metrics import basic_metrics, advanced_metrics
 from backend.app.services.calculations.signals import tech_signals
 
+_TECH_CLOSES = tuple(100 + i for i in range(80))
 
-def _mock_history(closes: list[float], start: date) -> dict:
-    data = []
-    for idx, close in enumerate(closes):
-        day = start + timedelta(days=idx)
-        data.append({"date": day.isoformat(), "close": close})
-    return {
+
+@lru_cache(maxsize=128)
+def _mock_history(closes: tuple[float, ...], start: date) -> Mapping:
+    base = start.toordinal()
+    dates = [date.fromordinal(base + idx).isoformat() for idx in range(len(closes))]
+    data = [{"date": day, "close": close} for day, close in zip(dates, closes)]
+    return MappingProxyType({
         "ticker": "VOO",
         "start": start.isoformat(),
-        "end": (start + timedelta(days=len(closes) - 1)).isoformat(),
+        "end": dates[-1],
         "interval": "1d",
         "count": len(closes),
         "data": data,
-    }
+    })
 
 
 @pytest.fixture
 def mock_history(monkeypatch):
     def factory(closes: list[float], start: date):
-        payload = _mock_history(closes, start)
+        payload = _mock_history(tuple(closes), start)
 
         def _fake_get_history(*args, **kwargs):  # noqa: ANN001, ANN202
             return payload
@@ -70,12 +75,11 @@ def test_advanced_metrics(mock_history):
 
 
 def test_tech_signals(mock_history):
-    closes = [100 + i for i in range(80)]
     start = date(2025, 1, 1)
-    mock_history(closes, start)
+    mock_history(_TECH_CLOSES, start)
 
     result = tech_signals("VOO", start, start + timedelta(days=79), window=10, fast=5, slow=20, rsi_period=14)
-    assert result["count"] == len(closes)
+    assert result["count"] == len(_TECH_CLOSES)
     assert result["momentum"] is not None
     assert result["sma_fast"] is not None
     assert result["sma_slow"] is not None
@@ -11,16 +11,16 @@ from backend.app.db.models import TransactionType
 @pytest.mark.asyncio
 async def test_create_and_get_portfolio(db_session):
     async with db_session.begin():
-        portfolio = await crud_portfolios.create_portfolio(db_session, name="Core")
-    fetched = await crud_portfolios.get_portfolio(db_session, portfolio.id)
-    assert fetched.id == portfolio.id
-    assert fetched.name == "Core"
+        async with db_session.begin_nested():
+            portfolio = await crud_portfolios.create_portfolio(db_session, name="Core")
+        fetched = await crud_portfolios.get_portfolio(db_session, portfolio.id)
+        assert fetched.id == portfolio.id
+        assert fetched.name == "Core"
+        assert await crud_portfolios.portfolio_exists(db_session, portfolio.id)
 
-    await db_session.rollback()
-
-    with pytest.raises(PortfolioAlreadyExistsError):
-        async with db_session.begin():
-            await crud_portfolios.create_portfolio(db_session, name="Core")
+        with pytest.raises(PortfolioAlreadyExistsError):
+            async with db_session.begin_nested():
+                await crud_portfolios.create_portfolio(db_session, name="Core")
 
 
 @pytest.mark.asyncio
@@ -32,7 +32,7 @@ async def test_transaction_validation(db_session):
         async with db_session.begin():
             await crud_transactions.create_transaction(
                 db_session,
-                portfolio=portfolio,
+                portfolio_id=portfolio.id,
                 ticker="VOO",
                 tx_type=TransactionType.BUY,
                 tx_date=date(2024, 1, 1),
@@ -45,37 +45,23 @@ async def test_transaction_validation(db_session):
 @pytest.mark.asyncio
 async def test_aggregate_positions(db_session):
     async with db_session.begin():
-        portfolio = await crud_portfolios.create_portfolio(db_session, name="Positions")
+        async with db_session.begin_nested():
+            portfolio = await crud_portfolios.create_portfolio(db_session, name="Positions")
 
-    async with db_session.begin():
-        await crud_transactions.create_transaction(
-            db_session,
-            portfolio=portfolio,
-            ticker="VOO",
-            tx_type=TransactionType.BUY,
-            tx_date=date(2024, 1, 1),
-            quantity=10,
-            price=100,
-            amount=None,
-        )
-        await crud_transactions.create_transaction(
-            db_session,
-            portfolio=portfolio,
-            ticker="VOO",
-            tx_type=TransactionType.SELL,
-            tx_date=date(2024, 1, 1),
-            quantity=2,
-            price=110,
-            amount=None,
-        )
+        rows = [
+            {"ticker": "VOO", "tx_type": TransactionType.BUY, "tx_date": date(2024, 1, 1), "quantity": 10, "price": 100},
+            {"ticker": "VOO", "tx_type": TransactionType.SELL, "tx_date": date(2024, 1, 1), "quantity": 2, "price": 110},
+        ]
+        async with db_session.begin_nested():
+            await crud_transactions.create_transactions_many(db_session, portfolio_id=portfolio.id, rows=rows)
 
-    result = await crud_transactions.aggregate_positions(db_session, portfolio_id=portfolio.id)
-    assert len(result) == 1
-    aggregated = result[0]
-    assert aggregated["ticker"] == "VOO"
-    assert float(aggregated["quantity"]) == pytest.approx(8.0)
-    # cost = 10*100 - 2*110 = 780
-    assert float(aggregated["cost"]) == pytest.approx(780.0)
+        result = await crud_transactions.aggregate_positions(db_session, portfolio_id=portfolio.id)
+        assert len(result) == 1
+        aggregated = result[0]
+        assert aggregated["ticker"] == "VOO"
+        assert float(aggregated["quantity"]) == pytest.approx(8.0)
+        # cost = 10*100 - 2*110 = 780
+        assert float(aggregated["cost"]) == pytest.approx(780.0)
 
 
 
@@ -83,53 +69,100 @@ async def test_aggregate_positions(db_session):
 
 @pytest.mark.asyncio
 async def test_list_and_delete_transactions(db_session):
-    async with db_session.begin():
-        portfolio = await crud_portfolios.create_portfolio(db_session, name="Lister")
-
     tx_date = date(2024, 1, 1)
     async with db_session.begin():
-        tx1 = await crud_transactions.create_transaction(
-            db_session,
-            portfolio=portfolio,
-            ticker="VOO",
-            tx_type=TransactionType.BUY,
-            tx_date=tx_date,
-            quantity=5,
-            price=100,
-            amount=None,
-        )
-        await crud_transactions.create_transaction(
-            db_session,
-            portfolio=portfolio,
-            ticker="VOO",
-            tx_type=TransactionType.SELL,
-            tx_date=tx_date,
-            quantity=2,
-            price=110,
-            amount=None,
-        )
+        async with db_session.begin_nested():
+            portfolio = await crud_portfolios.create_portfolio(db_session, name="Lister")
 
-    count = await crud_transactions.count_transactions(db_session, portfolio_id=portfolio.id)
-    assert count == 2
+        rows = [
+            {"ticker": "VOO", "tx_type": TransactionType.BUY, "tx_date": tx_date, "quantity": 5, "price": 100},
+            {"ticker": "VOO", "tx_type": TransactionType.SELL, "tx_date": tx_date, "quantity": 2, "price": 110},
+        ]
+        async with db_session.begin_nested():
+            tx1, _ = await crud_transactions.create_transactions_many(db_session, portfolio_id=portfolio.id, rows=rows)
 
-    items = await crud_transactions.list_transactions(db_session, portfolio_id=portfolio.id)
-    assert len(items) == 2
+        count = await crud_transactions.count_transactions(db_session, portfolio_id=portfolio.id)
+        assert count == 2
 
-    await db_session.rollback()
+        items = await crud_transactions.list_transactions(db_session, portfolio_id=portfolio.id)
+        assert len(items) == 2
 
+        async with db_session.begin_nested():
+            await crud_transactions.delete_transaction(
+                db_session,
+                portfolio_id=portfolio.id,
+                transaction_id=tx1.id,
+            )
+
+        remaining = await crud_transactions.count_transactions(db_session, portfolio_id=portfolio.id)
+        assert remaining == 1
+
+
+
+
+@pytest.mark.asyncio
+async def test_create_transactions_many(db_session):
     async with db_session.begin():
-        await crud_transactions.delete_transaction(
-            db_session,
-            portfolio_id=portfolio.id,
-            transaction_id=tx1.id,
-        )
+        portfolio = await crud_portfolios.create_portfolio(db_session, name="Bulk")
+
+    rows = [
+        {"ticker": "voo", "tx_type": "BUY", "tx_date": date(2024, 1, 1), "quantity": 4, "price": 100},
+        {"ticker": "VOO", "tx_type": TransactionType.SELL, "tx_date": date(2024, 1, 2), "quantity": 1, "price": 105},
+        {"ticker": "VOO", "tx_type": "DIVIDEND", "tx_date": date(2024, 1, 3), "amount": 2},
+    ]
+    async with db_session.begin():
+        created = await crud_transactions.create_transactions_many(db_session, portfolio_id=portfolio.id, rows=rows)
+
+    assert [tx.type for tx in created] == [TransactionType.BUY, TransactionType.SELL, TransactionType.DIVIDEND]
+    assert all(tx.id is not None and tx.ticker == "VOO" for tx in created)
+    assert await crud_transactions.count_transactions(db_session, portfolio_id=portfolio.id) == 3
+
+    first_page = await crud_transactions.list_transactions(db_session, portfolio_id=portfolio.id, limit=2)
+    next_page = await crud_transactions.list_transactions(
+        db_session,
+        portfolio_id=portfolio.id,
+        limit=2,
+        after_id=first_page[-1].id,
+    )
+    assert [tx.id for tx in first_page + next_page] == [tx.id for tx in created]
+
+    page, total = await crud_transactions.list_transactions_with_total(
+        db_session, portfolio_id=portfolio.id, limit=1, offset=1
+    )
+    assert ([tx.id for tx in page], total) == ([created[1].id], 3)
+
+    page, total = await crud_transactions.list_transactions_with_total(
+        db_session, portfolio_id=portfolio.id, limit=2, after_id=created[1].id
+    )
+    assert ([tx.id for tx in page], total) == ([created[2].id], 3)
+
+    deltas = await crud_transactions.load_quantity_deltas(db_session, portfolio_id=portfolio.id)
+    assert [(row.date.day, float(row.signed_quantity)) for row in deltas] == [(1, 4.0), (2, -1.0), (3, 0.0)]
 
     await db_session.rollback()
 
-    remaining = await crud_transactions.count_transactions(db_session, portfolio_id=portfolio.id)
-    assert remaining == 1
+    with pytest.raises(InvalidTransactionError):
+        async with db_session.begin():
+            await crud_transactions.create_transactions_many(
+                db_session,
+                portfolio_id=portfolio.id,
+                rows=[{"ticker": "VOO", "tx_type": "BUY", "tx_date": date(2024, 1, 4), "price": 100}],
+            )
 
+    for missing in ("ticker", "tx_type", "tx_date"):
+        row = {"ticker": "VOO", "tx_type": "BUY", "tx_date": date(2024, 1, 4), "quantity": 1, "price": 100}
+        del row[missing]
+        with pytest.raises(InvalidTransactionError):
+            async with db_session.begin():
+                await crud_transactions.create_transactions_many(db_session, portfolio_id=portfolio.id, rows=[row])
 
+    with pytest.raises(PortfolioNotFoundError):
+        async with db_session.begin():
+            await crud_transactions.create_transactions_many(
+                db_session,
+                portfolio_id=uuid.uuid4(),
+                rows=[{"ticker": "VOO", "tx_type": "BUY", "tx_date": date(2024, 1, 4), "quantity": 1, "price": 100}],
+            )
 
 
 @pytest.mark.asyncio
@@ -143,52 +176,56 @@ async def test_create_portfolio_invalid_name(db_session):
 async def test_get_portfolio_not_found(db_session):
     with pytest.raises(PortfolioNotFoundError):
         await crud_portfolios.get_portfolio(db_session, uuid.uuid4())
+    assert not await crud_portfolios.portfolio_exists(db_session, uuid.uuid4())
 
 
 @pytest.mark.asyncio
 async def test_portfolio_listing_with_filters(db_session):
     tx_date = date(2024, 2, 1)
     async with db_session.begin():
-        portfolio = await crud_portfolios.create_portfolio(db_session, name="Coverage")
-        await crud_transactions.create_transaction(
-            db_session,
-            portfolio=portfolio,
-            ticker="VOO",
-            tx_type=TransactionType.BUY,
-            tx_date=tx_date,
-            quantity=1,
-            price=100,
-            amount=None,
-        )
+        async with db_session.begin_nested():
+            portfolio = await crud_portfolios.create_portfolio(db_session, name="Coverage")
+            await crud_transactions.create_transaction(
+                db_session,
+                portfolio_id=portfolio.id,
+                ticker="VOO",
+                tx_type=TransactionType.BUY,
+                tx_date=tx_date,
+                quantity=1,
+                price=100,
+                amount=None,
+            )
 
-    total = await crud_portfolios.count_portfolios(db_session)
-    assert total == 1
+        total = await crud_portfolios.count_portfolios(db_session)
+        assert total == 1
 
-    items = await crud_portfolios.list_portfolios(db_session, with_transactions=True)
-    assert len(items) == 1
-    assert len(items[0].transactions) == 1
+        page, total = await crud_portfolios.list_portfolios_with_total(db_session)
+        assert ([p.id for p in page], total) == ([portfolio.id], 1)
+        assert await crud_portfolios.list_portfolios_with_total(db_session, offset=5) == ([], 1)
 
-    filtered_count = await crud_transactions.count_transactions(
-        db_session,
-        portfolio_id=portfolio.id,
-        start=tx_date,
-        end=tx_date,
-        ticker="VOO",
-    )
-    assert filtered_count == 1
+        items = await crud_portfolios.list_portfolios(db_session, with_transactions=True)
+        assert len(items) == 1
+        assert len(items[0].transactions) == 1
 
-    filtered_transactions = await crud_transactions.list_transactions(
-        db_session,
-        portfolio_id=portfolio.id,
-        start=tx_date,
-        end=tx_date,
-        ticker="VOO",
-    )
-    assert len(filtered_transactions) == 1
+        filtered_count = await crud_transactions.count_transactions(
+            db_session,
+            portfolio_id=portfolio.id,
+            start=tx_date,
+            end=tx_date,
+            ticker="VOO",
+        )
+        assert filtered_count == 1
 
-    await db_session.rollback()
+        filtered_transactions = await crud_transactions.list_transactions(
+            db_session,
+            portfolio_id=portfolio.id,
+            start=tx_date,
+            end=tx_date,
+            ticker="VOO",
+        )
+        assert len(filtered_transactions) == 1
 
-    async with db_session.begin():
-        await crud_portfolios.delete_portfolio(db_session, portfolio_id=portfolio.id)
+        async with db_session.begin_nested():
+            await crud_portfolios.delete_portfolio(db_session, portfolio_id=portfolio.id)
 
-    assert await crud_portfolios.count_portfolios(db_session) == 0
+        assert await crud_portfolios.count_portfolios(db_session) == 0
@@ -1,4 +1,6 @@
+from contextvars import ContextVar
 from datetime import date
+from typing import Any
 
 import pandas as pd
 import pytest
@@ -7,56 +9,76 @@ from fastapi import HTTPException
 from backend.app.services import market_data
 from tests.helpers import make_market_dataframe
 
+# The service only reshapes copies of the downloaded frame, so tests can share these.
+_DF_LAST = make_market_dataframe([100.0, 101.25, 102.5], tz="UTC")
+_DF_OHLC = make_market_dataframe([100.0, 101.5, 99.5], tz="UTC", volumes=[1000, 2000, 3000])
+_DF_PAIR = make_market_dataframe([100.0, 101.0], tz="UTC")
+_DF_NO_VOLUME = _DF_PAIR.drop(columns=["Volume"])
+_DF_CLOSE_ONLY = pd.DataFrame({"Close": [50.0, 51.0]}, index=pd.date_range("2024-01-01", periods=2, tz="UTC"))
+_DF_ALL_NAN = make_market_dataframe([None, None, None], tz="UTC", volumes=[None, None, None])
+_DF_EMPTY = pd.DataFrame()
 
-def test_get_last_close_success(monkeypatch: pytest.MonkeyPatch) -> None:
-    df = make_market_dataframe([100.0, 101.25, 102.5], tz="UTC")
-    monkeypatch.setattr("backend.app.services.market_data.yf.download", lambda **_: df)
 
-    result = market_data.get_last_close("voo")
+def _raise_download(**_: object) -> pd.DataFrame:
+    raise RuntimeError("boom")
 
-    assert result["ticker"] == "VOO"
-    assert result["date"] == "2024-01-03"
-    assert result["close"] == pytest.approx(102.5)
 
+# What the patched yf.download returns: a frame, or a callable invoked with the download kwargs.
+_RESPONSE: ContextVar[Any] = ContextVar("download_response", default=None)
 
-def test_get_last_close_download_failure(monkeypatch: pytest.MonkeyPatch) -> None:
-    def _raise(**_: object) -> pd.DataFrame:  # pragma: no cover - signature only
-        raise RuntimeError("boom")
 
-    monkeypatch.setattr("backend.app.services.market_data.yf.download", _raise)
+def _fake_download(**kwargs: object) -> pd.DataFrame:
+    response = _RESPONSE.get()
+    if response is None:
+        raise AssertionError("test did not set a download response")
+    return response(**kwargs) if callable(response) else response
 
-    with pytest.raises(HTTPException) as exc:
-        market_data.get_last_close("spy")
 
-    assert exc.value.status_code == 502
-    assert "Error downloading data" in exc.value.detail
+@pytest.fixture(scope="module", autouse=True)
+def _patch_download():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("backend.app.services.market_data.yf.download", _fake_download)
+        yield
 
 
-def test_get_last_close_empty_response(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setattr(
-        "backend.app.services.market_data.yf.download",
-        lambda **_: pd.DataFrame(),
-    )
+@pytest.fixture(autouse=True)
+def _reset_response():
+    token = _RESPONSE.set(None)
+    yield
+    _RESPONSE.reset(token)
 
-    with pytest.raises(HTTPException) as exc:
-        market_data.get_last_close("iwm")
 
-    assert exc.value.status_code == 404
+def test_get_last_close_success() -> None:
+    _RESPONSE.set(_DF_LAST)
 
+    result = market_data.get_last_close("voo")
 
-def test_get_last_close_dropna_removes_all(monkeypatch: pytest.MonkeyPatch) -> None:
-    df = make_market_dataframe([None, None], tz="UTC")
-    monkeypatch.setattr("backend.app.services.market_data.yf.download", lambda **_: df)
+    assert result["ticker"] == "VOO"
+    assert result["date"] == "2024-01-03"
+    assert result["close"] == pytest.approx(102.5)
+
+
+@pytest.mark.parametrize(
+    ("download", "status_code"),
+    [
+        pytest.param(_raise_download, 502, id="download-failure"),
+        pytest.param(_DF_EMPTY, 404, id="empty-response"),
+        pytest.param(_DF_ALL_NAN, 404, id="all-nan"),
+    ],
+)
+def test_get_last_close_errors(download, status_code: int) -> None:
+    _RESPONSE.set(download)
 
     with pytest.raises(HTTPException) as exc:
-        market_data.get_last_close("ndx")
+        market_data.get_last_close("spy")
 
-    assert exc.value.status_code == 404
+    assert exc.value.status_code == status_code
+    if status_code == 502:
+        assert "Error downloading data" in exc.value.detail
 
 
-def test_get_history_success_with_ohlc(monkeypatch: pytest.MonkeyPatch) -> None:
-    df = make_market_dataframe([100.0, 101.5, 99.5], tz="UTC", volumes=[1000, 2000, 3000])
-    monkeypatch.setattr("backend.app.services.market_data.yf.download", lambda **_: df)
+def test_get_history_success_with_ohlc() -> None:
+    _RESPONSE.set(_DF_OHLC)
 
     result = market_data.get_history("aapl", date(2024, 1, 1), date(2024, 1, 3), interval="1d")
 
@@ -79,10 +101,8 @@ def test_get_history_success_with_ohlc(monkeypatch: pytest.MonkeyPatch) -> None:
     assert last["close"] == pytest.approx(99.5)
 
 
-def test_get_history_handles_close_only(monkeypatch: pytest.MonkeyPatch) -> None:
-    idx = pd.date_range("2024-01-01", periods=2, tz="UTC")
-    df = pd.DataFrame({"Close": [50.0, 51.0]}, index=idx)
-    monkeypatch.setattr("backend.app.services.market_data.yf.download", lambda **_: df)
+def test_get_history_handles_close_only() -> None:
+    _RESPONSE.set(_DF_CLOSE_ONLY)
 
     result = market_data.get_history("tsla", date(2024, 1, 1), date(2024, 1, 2))
     candle = result["data"][0]
@@ -91,10 +111,8 @@ def test_get_history_handles_close_only(monkeypatch: pytest.MonkeyPatch) -> None
     assert candle.get("volume") is None
 
 
-def test_get_history_volume_defaults_to_zero_when_missing(monkeypatch: pytest.MonkeyPatch) -> None:
-    df = make_market_dataframe([110.0, 111.0], tz="UTC")
-    df = df.drop(columns=["Volume"])
-    monkeypatch.setattr("backend.app.services.market_data.yf.download", lambda **_: df)
+def test_get_history_volume_defaults_to_zero_when_missing() -> None:
+    _RESPONSE.set(_DF_NO_VOLUME)
 
     result = market_data.get_history("msft", date(2024, 1, 1), date(2024, 1, 2))
 
@@ -109,32 +127,76 @@ def test_get_history_validates_dates() -> None:
     assert "start must be on or before end" in exc.value.detail
 
 
-def test_get_history_download_failure(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setattr(
-        "backend.app.services.market_data.yf.download",
-        lambda **_: (_ for _ in ()).throw(RuntimeError("network")),
-    )
+@pytest.mark.parametrize(
+    ("download", "status_code"),
+    [
+        pytest.param(_raise_download, 502, id="download-failure"),
+        pytest.param(_DF_EMPTY, 404, id="empty-dataframe"),
+        pytest.param(_DF_ALL_NAN, 404, id="all-nan"),
+    ],
+)
+def test_get_history_errors(download, status_code: int) -> None:
+    _RESPONSE.set(download)
 
     with pytest.raises(HTTPException) as exc:
-        market_data.get_history("dia", date(2024, 1, 1), date(2024, 1, 2))
+        market_data.get_history("dia", date(2024, 1, 1), date(2024, 1, 3))
 
-    assert exc.value.status_code == 502
+    assert exc.value.status_code == status_code
 
 
-def test_get_history_empty_dataframe(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setattr("backend.app.services.market_data.yf.download", lambda **_: pd.DataFrame())
+def test_get_history_is_cached_per_range() -> None:
+    calls: list[dict] = []
 
-    with pytest.raises(HTTPException) as exc:
-        market_data.get_history("uso", date(2024, 1, 1), date(2024, 1, 2))
+    def _download(**kwargs: object) -> pd.DataFrame:
+        calls.append(kwargs)
+        return _DF_PAIR
 
-    assert exc.value.status_code == 404
+    _RESPONSE.set(_download)
 
+    first = market_data.get_history("spy", date(2024, 1, 1), date(2024, 1, 2))
+    second = market_data.get_history("SPY", date(2024, 1, 1), date(2024, 1, 2))
+    market_data.get_history("SPY", date(2024, 1, 1), date(2024, 1, 3))
 
-def test_get_history_dropna_results_in_empty_payload(monkeypatch: pytest.MonkeyPatch) -> None:
-    df = make_market_dataframe([None, None, None], tz="UTC", volumes=[None, None, None])
-    monkeypatch.setattr("backend.app.services.market_data.yf.download", lambda **_: df)
+    assert second == first
+    assert len(calls) == 2
 
-    with pytest.raises(HTTPException) as exc:
-        market_data.get_history("ibo", date(2024, 1, 1), date(2024, 1, 3))
+    market_data.clear_cache()
+    market_data.get_history("SPY", date(2024, 1, 1), date(2024, 1, 2))
+    assert len(calls) == 3
+
+
+def test_get_last_close_does_not_cache_failures() -> None:
+    responses = [_DF_EMPTY, make_market_dataframe([10.0], tz="UTC")]
+    _RESPONSE.set(lambda **_: responses.pop(0))
+
+    with pytest.raises(HTTPException):
+        market_data.get_last_close("efa")
+
+    assert market_data.get_last_close("efa")["close"] == pytest.approx(10.0)
+
+
+def test_get_history_batch_downloads_misses_once() -> None:
+    frames = {
+        "VOO": _DF_PAIR,
+        "BND": make_market_dataframe([70.0, 70.5], tz="UTC"),
+        "GONE": make_market_dataframe([None, None], tz="UTC"),
+    }
+    combined = pd.concat(frames, axis=1).swaplevel(axis=1)
+    calls = []
+
+    def _download(**kwargs):
+        calls.append(kwargs["tickers"])
+        return combined
+
+    _RESPONSE.set(_download)
+
+    cached = market_data.get_history("voo", date(2024, 1, 1), date(2024, 1, 2))
+    result = market_data.get_history_batch(["voo", "bnd", "gone"], date(2024, 1, 1), date(2024, 1, 2))
+
+    assert calls == ["voo", "BND GONE"]
+    assert set(result) == {"VOO", "BND"}
+    assert result["VOO"] == cached
+    assert [row["close"] for row in result["BND"]["data"]] == [pytest.approx(70.0), pytest.approx(70.5)]
 
-    assert exc.value.status_code == 404
+    assert market_data.get_history("BND", date(2024, 1, 1), date(2024, 1, 2)) == result["BND"]
+    assert len(calls) == 2
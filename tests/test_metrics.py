@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import math
 from datetime import date
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
 
 import numpy as np
-import pandas as pd
 import pytest
 from fastapi import HTTPException
 
@@ -11,10 +14,14 @@ from backend.app.services.calculations import metrics
 from tests.helpers import make_history_payload
 
 
-def _expected_basic_metrics(closes: list[float], rf: float) -> dict[str, float | None]:
-    df = pd.DataFrame({"close": closes})
-    df["ret"] = df["close"].pct_change()
-    rets = df["ret"].dropna()
+def _is_missing(value: float | None) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+@lru_cache(maxsize=128)
+def _expected_basic_metrics(closes: tuple[float, ...], rf: float) -> Mapping[str, float | None]:
+    c = np.asarray(closes, dtype=np.float64)
+    rets = np.diff(c) / c[:-1]
     mean_daily = float(rets.mean())
     std_daily = float(rets.std(ddof=1))
     ann_return = float((1 + mean_daily) ** metrics.TRADING_DAYS - 1)
@@ -27,46 +34,32 @@ def _expected_basic_metrics(closes: list[float], rf: float) -> dict[str, float |
     ann_excess = float((rets - rf_daily).mean() * metrics.TRADING_DAYS)
     sharpe = float(ann_excess / ann_vol) if ann_vol > 0 else None
 
-    equity = (1 + rets).cumprod()
-    peak = equity.cummax()
-    drawdown = (equity / peak) - 1.0
-    max_dd = float(drawdown.min())
+    equity = np.cumprod(1 + rets)
+    peak = np.maximum.accumulate(equity)
+    max_dd = float(((equity / peak) - 1.0).min())
 
-    return {
+    return MappingProxyType({
         "ann_return": ann_return,
         "ann_volatility": ann_vol,
         "sharpe": sharpe,
         "max_drawdown": max_dd,
-    }
-
-
-def _expected_advanced_metrics(closes: list[float], rf: float, mar: float) -> dict[str, float | None]:
-    df = pd.DataFrame({"close": closes})
-    df["ret"] = df["close"].pct_change()
-    rets = df["ret"].dropna()
-    mean_daily = float(rets.mean())
-    std_daily = float(rets.std(ddof=1))
-    ann_return = float((1 + mean_daily) ** metrics.TRADING_DAYS - 1)
-    ann_vol = float(std_daily * np.sqrt(metrics.TRADING_DAYS))
+    })
 
-    if rf:
-        rf_daily = (1 + rf) ** (1 / metrics.TRADING_DAYS) - 1
-    else:
-        rf_daily = 0.0
-    ann_excess = float((rets - rf_daily).mean() * metrics.TRADING_DAYS)
-    sharpe = float(ann_excess / ann_vol) if ann_vol > 0 else None
 
-    equity = (1 + rets).cumprod()
-    peak = equity.cummax()
-    drawdown = (equity / peak) - 1.0
-    max_dd = float(drawdown.min())
+@lru_cache(maxsize=128)
+def _expected_advanced_metrics(closes: tuple[float, ...], rf: float, mar: float) -> Mapping[str, float | None]:
+    basic = _expected_basic_metrics(closes, rf)
+    c = np.asarray(closes, dtype=np.float64)
+    rets = np.diff(c) / c[:-1]
+    ann_return = basic["ann_return"]
+    max_dd = basic["max_drawdown"]
 
     if mar:
         mar_daily = (1 + mar) ** (1 / metrics.TRADING_DAYS) - 1
     else:
         mar_daily = 0.0
     downside = rets[rets < mar_daily]
-    if downside.empty:
+    if downside.size == 0:
         downside_vol_ann = None
         sortino = None
     else:
@@ -75,18 +68,15 @@ def _expected_advanced_metrics(closes: list[float], rf: float, mar: float) -> di
         sortino = float((ann_return - mar) / downside_vol_ann) if downside_vol_ann > 0 else None
 
     calmar = float(ann_return / abs(max_dd)) if max_dd < 0 else None
-    ytd_return = float(closes[-1] / closes[0] - 1.0)
+    ytd_return = float(c[-1] / c[0] - 1.0)
 
-    return {
-        "ann_return": ann_return,
-        "ann_volatility": ann_vol,
-        "sharpe": sharpe,
-        "max_drawdown": max_dd,
+    return MappingProxyType({
+        **basic,
         "downside_volatility": downside_vol_ann,
         "sortino": sortino,
         "calmar": calmar,
         "ytd_return": ytd_return,
-    }
+    })
 
 
 def test_basic_metrics_success(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -95,13 +85,12 @@ def test_basic_metrics_success(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(metrics, "get_history", lambda *_, **__: payload)
 
     result = metrics.basic_metrics("voo", date(2024, 1, 1), date(2024, 1, 5), rf=0.01)
-    expected = _expected_basic_metrics(closes, rf=0.01)
+    expected = _expected_basic_metrics(tuple(closes), rf=0.01)
 
     assert result["ticker"] == "VOO"
     assert result["n"] == len(closes)
     assert result["rf"] == pytest.approx(0.01)
-    for key, value in expected.items():
-        assert result[key] == pytest.approx(value, rel=5e-6, abs=1e-6)
+    assert {key: result[key] for key in expected} == pytest.approx(dict(expected), rel=5e-6, abs=1e-6)
 
 
 def test_basic_metrics_zero_rf_branch(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -110,11 +99,10 @@ def test_basic_metrics_zero_rf_branch(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(metrics, "get_history", lambda *_, **__: payload)
 
     result = metrics.basic_metrics("zero", date(2024, 1, 1), date(2024, 1, 3), rf=0.0)
-    expected = _expected_basic_metrics(closes, rf=0.0)
+    expected = _expected_basic_metrics(tuple(closes), rf=0.0)
 
     assert result["rf"] == pytest.approx(0.0)
-    for key, value in expected.items():
-        assert result[key] == pytest.approx(value, rel=5e-6, abs=1e-6)
+    assert {key: result[key] for key in expected} == pytest.approx(dict(expected), rel=5e-6, abs=1e-6)
 
 
 def test_basic_metrics_requires_two_points(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -155,20 +143,16 @@ def test_advanced_metrics_success(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(metrics, "get_history", lambda *_, **__: payload)
 
     result = metrics.advanced_metrics("adv", date(2024, 1, 1), date(2024, 1, 5), rf=0.01, mar=0.0)
-    expected = _expected_advanced_metrics(closes, rf=0.01, mar=0.0)
+    expected = _expected_advanced_metrics(tuple(closes), rf=0.01, mar=0.0)
 
     assert result["ticker"] == "ADV"
     assert result["n"] == len(closes)
     assert result["rf"] == pytest.approx(0.01)
     assert result["mar"] == pytest.approx(0.0)
-    for key, value in expected.items():
-        if value is None or (isinstance(value, float) and np.isnan(value)):
-            if key in result and result[key] is not None:
-                assert result[key] == pytest.approx(value, rel=5e-6, abs=1e-6)
-            else:
-                assert result[key] is None or (isinstance(result[key], float) and np.isnan(result[key]))
-        else:
-            assert result[key] == pytest.approx(value, rel=5e-6, abs=1e-6)
+    missing = {key for key, value in expected.items() if _is_missing(value)}
+    assert all(_is_missing(result[key]) for key in missing)
+    numeric = {key: value for key, value in expected.items() if key not in missing}
+    assert {key: result[key] for key in numeric} == pytest.approx(numeric, rel=5e-6, abs=1e-6)
 
 
 def test_advanced_metrics_requires_two_points(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -209,7 +193,7 @@ def test_advanced_metrics_downside_empty(monkeypatch: pytest.MonkeyPatch) -> Non
     monkeypatch.setattr(metrics, "get_history", lambda *_, **__: payload)
 
     result = metrics.advanced_metrics("pos", date(2024, 1, 1), date(2024, 1, 4), rf=0.0, mar=0.5)
-    expected = _expected_advanced_metrics(closes, rf=0.0, mar=0.5)
+    expected = _expected_advanced_metrics(tuple(closes), rf=0.0, mar=0.5)
 
     assert result["downside_volatility"] is None
     assert result["sortino"] is None
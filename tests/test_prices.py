@@ -3,6 +3,7 @@ from __future__ import annotations
 from datetime import date
 
 import pytest
+from sqlalchemy import insert
 
 from backend.app.db import crud_prices
 from backend.app.db.models import Price
@@ -11,11 +12,14 @@ from backend.app.db.models import Price
 @pytest.mark.asyncio
 async def test_price_queries(db_session):
     async with db_session.begin():
-        db_session.add_all([
-            Price(id=10, ticker="VOO", date=date(2025, 1, 1), open=100.0, high=101.0, low=99.0, close=100.5, volume=1000),
-            Price(id=11, ticker="VOO", date=date(2025, 1, 2), open=101.0, high=105.0, low=100.0, close=104.0, volume=1200),
-            Price(id=12, ticker="SPY", date=date(2025, 1, 1), open=400.0, high=402.0, low=398.0, close=401.0, volume=2000),
-        ])
+        await db_session.execute(
+            insert(Price),
+            [
+                {"id": 10, "ticker": "VOO", "date": date(2025, 1, 1), "open": 100.0, "high": 101.0, "low": 99.0, "close": 100.5, "volume": 1000},
+                {"id": 11, "ticker": "VOO", "date": date(2025, 1, 2), "open": 101.0, "high": 105.0, "low": 100.0, "close": 104.0, "volume": 1200},
+                {"id": 12, "ticker": "SPY", "date": date(2025, 1, 1), "open": 400.0, "high": 402.0, "low": 398.0, "close": 401.0, "volume": 2000},
+            ],
+        )
 
     last = await crud_prices.get_last_price(db_session, "VOO")
     assert last is not None and float(last.close) == 104.0
@@ -32,3 +36,55 @@ async def test_price_queries(db_session):
 
     history = await crud_prices.load_price_history_for_tickers(db_session, ["VOO"], date(2025, 1, 1), date(2025, 1, 2))
     assert "VOO" in history and len(history["VOO"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_prices_range_paged_keyset(db_session):
+    async with db_session.begin():
+        await db_session.execute(
+            insert(Price),
+            [{"id": 20 + day, "ticker": "QQQ", "date": date(2025, 1, day), "close": 300.0 + day} for day in range(1, 6)],
+        )
+
+    first_page = await crud_prices.read_prices_range_paged(db_session, "qqq", date(2025, 1, 1), None, limit=2)
+    assert [row.date.day for row in first_page] == [1, 2]
+
+    next_page = await crud_prices.read_prices_range_paged(
+        db_session, "qqq", date(2025, 1, 1), None, limit=2, offset=99, after=first_page[-1].date
+    )
+    assert [row.date.day for row in next_page] == [3, 4]
+
+    rows, total = await crud_prices.read_prices_range_paged_with_total(
+        db_session, "qqq", date(2025, 1, 1), date(2025, 1, 4), limit=2, offset=1
+    )
+    assert ([row.date.day for row in rows], total) == ([2, 3], 4)
+
+    rows, total = await crud_prices.read_prices_range_paged_with_total(
+        db_session, "QQQ", date(2025, 1, 1), None, limit=2, offset=10
+    )
+    assert (rows, total) == ([], 5)
+
+    rows, total = await crud_prices.read_prices_range_paged_with_total(
+        db_session, "QQQ", date(2025, 1, 1), None, limit=2, after=date(2025, 1, 4)
+    )
+    assert ([row.date.day for row in rows], total) == ([5], 5)
+
+
+@pytest.mark.asyncio
+async def test_upsert_prices_batched_updates_existing_rows(db_session):
+    rows = [
+        {"date": date.fromordinal(date(2024, 1, 1).toordinal() + idx).isoformat(), "close": 100.0 + idx, "volume": 10}
+        for idx in range(crud_prices.EXECUTEMANY_THRESHOLD + 20)
+    ]
+    async with db_session.begin():
+        inserted = await crud_prices.upsert_prices(db_session, "dia", rows)
+    assert inserted == len(rows)
+
+    updated_rows = [{**row, "close": row["close"] + 1.0} for row in rows]
+    async with db_session.begin():
+        updated = await crud_prices.upsert_prices(db_session, "DIA", updated_rows)
+    assert updated == len(rows)
+
+    assert await crud_prices.count_prices_range(db_session, "DIA", date(2024, 1, 1), None) == len(rows)
+    last = await crud_prices.get_last_price(db_session, "DIA")
+    assert float(last.close) == pytest.approx(rows[-1]["close"] + 1.0)
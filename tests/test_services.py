@@ -3,6 +3,9 @@ from __future__ import annotations
 from datetime import date
 
 import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import insert
 
 from backend.app.db import crud_portfolios, crud_prices, crud_transactions
 from backend.app.db.models import Price, TransactionType
@@ -15,26 +18,38 @@ async def _seed_portfolio(session, name: str = "Test"):
     return portfolio
 
 
-@pytest.mark.asyncio
-async def test_compute_positions(db_session, monkeypatch):
-    portfolio = await _seed_portfolio(db_session)
-    trade_date = date(2025, 1, 1)
+@pytest_asyncio.fixture
+async def seeded_voo(db_session):
+    """One VOO buy of 10 @ 100 on the first of three priced days."""
+    portfolio = await _seed_portfolio(db_session, name="Seeded")
+    start = date(2025, 1, 1)
+    end = date(2025, 1, 3)
 
     async with db_session.begin():
         await crud_transactions.create_transaction(
             db_session,
-            portfolio=portfolio,
+            portfolio_id=portfolio.id,
             ticker="VOO",
             tx_type=TransactionType.BUY,
-            tx_date=trade_date,
+            tx_date=start,
             quantity=10,
             price=100,
             amount=None,
         )
-        db_session.add_all([
-            Price(id=1, ticker="VOO", date=trade_date, open=100.0, high=100.0, low=100.0, close=100.0, volume=1000),
-            Price(id=2, ticker="VOO", date=date(2025, 1, 2), open=102.0, high=106.0, low=101.0, close=105.0, volume=2000),
-        ])
+        await db_session.execute(
+            insert(Price),
+            [
+                {"id": 1, "ticker": "VOO", "date": start, "open": 100.0, "high": 100.0, "low": 100.0, "close": 100.0, "volume": 1000},
+                {"id": 2, "ticker": "VOO", "date": date(2025, 1, 2), "open": 102.0, "high": 106.0, "low": 101.0, "close": 105.0, "volume": 2000},
+                {"id": 3, "ticker": "VOO", "date": end, "open": 105.0, "high": 120.0, "low": 104.0, "close": 120.0, "volume": 1500},
+            ],
+        )
+    return portfolio, start, end
+
+
+@pytest.mark.asyncio
+async def test_compute_positions(db_session, seeded_voo, monkeypatch):
+    portfolio, _, _ = seeded_voo
 
     async def _fake_latest(session, tickers):
         return {
@@ -65,27 +80,36 @@ async def test_compute_positions(db_session, monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_compute_portfolio_metrics(db_session):
-    portfolio = await _seed_portfolio(db_session, name="Metrics")
-    start = date(2025, 1, 1)
-    end = date(2025, 1, 3)
-
+async def test_compute_positions_falls_back_to_last_close(db_session, monkeypatch):
+    portfolio = await _seed_portfolio(db_session, name="Fallback")
     async with db_session.begin():
-        await crud_transactions.create_transaction(
-            db_session,
-            portfolio=portfolio,
-            ticker="VOO",
-            tx_type=TransactionType.BUY,
-            tx_date=start,
-            quantity=5,
-            price=100,
-            amount=None,
-        )
-        db_session.add_all([
-            Price(id=3, ticker="VOO", date=start, open=100.0, high=100.0, low=100.0, close=100.0, volume=1000),
-            Price(id=4, ticker="VOO", date=date(2025, 1, 2), open=100.0, high=110.0, low=99.0, close=110.0, volume=1500),
-            Price(id=5, ticker="VOO", date=end, open=110.0, high=120.0, low=108.0, close=120.0, volume=2000),
-        ])
+        for ticker in ("BND", "GLD"):
+            await crud_transactions.create_transaction(
+                db_session,
+                portfolio_id=portfolio.id,
+                ticker=ticker,
+                tx_type=TransactionType.BUY,
+                tx_date=date(2025, 1, 1),
+                quantity=2,
+                price=50,
+                amount=None,
+            )
+
+    def _fake_last_close(ticker):
+        if ticker == "GLD":
+            raise HTTPException(status_code=404, detail="no data")
+        return {"ticker": ticker, "date": "2025-01-02", "close": 55.0}
+
+    from backend.app.services import portfolios as portfolios_service
+    monkeypatch.setattr(portfolios_service, "get_last_close", _fake_last_close)
+
+    positions = await compute_positions(db_session, portfolio_id=portfolio.id)
+    assert [(p.ticker, p.market_price) for p in positions] == [("BND", pytest.approx(55.0)), ("GLD", None)]
+
+
+@pytest.mark.asyncio
+async def test_compute_portfolio_metrics(db_session, seeded_voo):
+    portfolio, start, end = seeded_voo
 
     metrics = await compute_portfolio_metrics(
         db_session,
@@ -102,3 +126,40 @@ async def test_compute_portfolio_metrics(db_session):
     assert metrics.ann_volatility is not None and metrics.ann_volatility >= 0
     assert metrics.max_drawdown <= 0
 
+
+
+@pytest.mark.asyncio
+async def test_compute_portfolio_metrics_skips_non_trading_days(db_session):
+    portfolio = await _seed_portfolio(db_session, name="Weekend")
+
+    async with db_session.begin():
+        await crud_transactions.create_transaction(
+            db_session,
+            portfolio_id=portfolio.id,
+            ticker="VOO",
+            tx_type=TransactionType.BUY,
+            tx_date=date(2025, 1, 4),
+            quantity=5,
+            price=100,
+            amount=None,
+        )
+        await db_session.execute(
+            insert(Price),
+            [
+                {"id": 6, "ticker": "VOO", "date": date(2025, 1, 3), "close": 100.0},
+                {"id": 7, "ticker": "VOO", "date": date(2025, 1, 6), "close": 110.0},
+                {"id": 8, "ticker": "VOO", "date": date(2025, 1, 7), "close": 121.0},
+            ],
+        )
+
+    metrics = await compute_portfolio_metrics(
+        db_session,
+        portfolio_id=portfolio.id,
+        start=date(2025, 1, 3),
+        end=date(2025, 1, 7),
+        rf=0.0,
+        mar=0.0,
+    )
+    # The Saturday buy counts from Monday, so Monday -> Tuesday is the only return.
+    assert metrics.n_days == 1
+    assert metrics.ann_return == pytest.approx(1.1 ** 252 - 1)
@@ -4,15 +4,30 @@ import pytest
 from sqlalchemy import text
 
 from backend.app.db import session as db_session
+from tests.conftest import TEST_DATABASE_URL
 
 
 @pytest.mark.asyncio
-async def test_session_configuration(tmp_path):
-    db_file = tmp_path / "session.db"
-    db_session.configure_engine(f"sqlite+aiosqlite:///{db_file}")
+async def test_session_configuration(setup_test_db):
     maker = db_session.get_sessionmaker()
     assert maker is not None
+    assert str(db_session.get_engine().url) == TEST_DATABASE_URL
 
     async with maker() as session:
         result = await session.execute(text("SELECT 1"))
         assert result.scalar_one() == 1
+
+
+@pytest.mark.asyncio
+async def test_warm_pool_opens_base_connections(tmp_path, monkeypatch):
+    # configure_engine rebinds the process-wide engine; let monkeypatch put the shared one back afterwards.
+    for name in ("_engine", "SessionLocal", "ReadSessionLocal"):
+        monkeypatch.setattr(db_session, name, getattr(db_session, name))
+    db_file = tmp_path / "warm.db"
+    db_session.configure_engine(f"sqlite+aiosqlite:///{db_file}")
+    try:
+        await db_session.warm_pool()
+        pool = db_session.get_engine().pool
+        assert pool.checkedin() == pool.size()
+    finally:
+        await db_session.dispose_engine()
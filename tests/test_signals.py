@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import statistics
+import time
+from contextvars import ContextVar
 from datetime import date
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
 
-import pandas as pd
+import numpy as np
 import pytest
 from fastapi import HTTPException
 
@@ -10,119 +16,171 @@ from backend.app.services.calculations import signals
 from tests.helpers import make_history_payload
 
 
-def test_rsi_returns_none_for_constant_series() -> None:
-    series = pd.Series([10.0, 10.0, 10.0, 10.0])
-    assert signals._rsi(series, period=3) is None
+_TECH_CLOSES = (10.0, 12.0, 11.0, 13.0, 12.5, 14.0)
+_START = date(2024, 1, 1)
+_END_3 = date(2024, 1, 3)
+_END_4 = date(2024, 1, 4)
+_END_6 = date(2024, 1, 6)
+# Payload served by the patched signals.get_history for the current test.
+_PAYLOAD: ContextVar[Mapping | None] = ContextVar("history_payload", default=None)
+
+
+def _fake_history(*_: object, **__: object) -> Mapping:
+    payload = _PAYLOAD.get()
+    if payload is None:
+        raise AssertionError("test did not set a history payload")
+    return payload
+
 
+@pytest.fixture(scope="module", autouse=True)
+def _patch_history():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(signals, "get_history", _fake_history)
+        yield
 
-def test_tech_signals_success(monkeypatch: pytest.MonkeyPatch) -> None:
-    closes = [10.0, 12.0, 11.0, 13.0, 12.5, 14.0]
-    payload = make_history_payload(closes, ticker="TECH")
-    monkeypatch.setattr(signals, "get_history", lambda *_, **__: payload)
 
-    result = signals.tech_signals(
-        "tech",
-        date(2024, 1, 1),
-        date(2024, 1, 6),
-        window=3,
-        fast=2,
-        slow=3,
-        rsi_period=3,
+@pytest.fixture(autouse=True)
+def _reset_payload():
+    token = _PAYLOAD.set(None)
+    yield
+    _PAYLOAD.reset(token)
+
+
+def _frozen_payload(closes, ticker: str, *, drop_close: bool = False) -> Mapping:
+    payload = make_history_payload(closes, ticker=ticker)
+    records = tuple(
+        MappingProxyType({key: value for key, value in record.items() if not (drop_close and key == "close")})
+        for record in payload["data"]
     )
+    return MappingProxyType({**payload, "data": records})
 
-    closes_series = pd.Series(closes, dtype=float)
-    momentum = float(closes_series.pct_change(3).iloc[-1])
-    sma_fast = float(closes_series.rolling(2).mean().iloc[-1])
-    sma_slow = float(closes_series.rolling(3).mean().iloc[-1])
-    cross_flag = (closes_series.rolling(2).mean() > closes_series.rolling(3).mean()).astype(int)
-    cross_change = cross_flag.diff()
-    valid_changes = cross_change.dropna()
-    last_idx = valid_changes[valid_changes != 0].index[-1]
-    last_cross_date = payload["data"][last_idx]["date"]
-    last_cross_type = "golden" if cross_change.loc[last_idx] > 0 else "death"
-    expected_rsi = signals._rsi(closes_series, 3)
-
-    assert result["ticker"] == "TECH"
-    assert result["count"] == len(closes)
-    assert result["price"] == pytest.approx(closes[-1])
-    assert result["momentum_window"] == 3
-    assert result["momentum"] == pytest.approx(momentum)
-    assert result["sma_fast_window"] == 2
-    assert result["sma_fast"] == pytest.approx(sma_fast)
-    assert result["sma_slow_window"] == 3
-    assert result["sma_slow"] == pytest.approx(sma_slow)
-    assert result["cross_now"] is True
-    assert result["last_cross_date"] == last_cross_date
-    assert result["last_cross_type"] == last_cross_type
-    assert result["rsi_period"] == 3
-    if expected_rsi is None:
-        assert result["rsi"] is None
-    else:
-        assert result["rsi"] == pytest.approx(expected_rsi)
 
+# Median-of-five budget for one tech_signals call on the short success series.
+_TECH_SIGNALS_BUDGET_NS = 2_000_000
+_TIMING_RUNS = 5
 
-def test_tech_signals_requires_enough_history(monkeypatch: pytest.MonkeyPatch) -> None:
-    closes = [10.0, 11.0, 12.0]
-    payload = make_history_payload(closes, ticker="SHORT")
-    monkeypatch.setattr(signals, "get_history", lambda *_, **__: payload)
 
-    with pytest.raises(HTTPException) as exc:
-        signals.tech_signals("short", date(2024, 1, 1), date(2024, 1, 3), window=3, slow=3)
+@pytest.fixture
+def timed_tech_signals():
+    def _call(*args, **kwargs):
+        timings = []
+        for _ in range(_TIMING_RUNS):
+            started = time.perf_counter_ns()
+            result = signals.tech_signals(*args, **kwargs)
+            timings.append(time.perf_counter_ns() - started)
+        median = statistics.median(timings)
+        assert median < _TECH_SIGNALS_BUDGET_NS, f"tech_signals took {median / 1e6:.2f} ms (median of {_TIMING_RUNS})"
+        return result
 
-    assert exc.value.status_code == 404
+    return _call
 
 
-def test_tech_signals_requires_close_column(monkeypatch: pytest.MonkeyPatch) -> None:
-    payload = make_history_payload([10.0, 11.0, 12.0, 13.0], ticker="MISS")
-    for record in payload["data"]:
-        record.pop("close")
-    monkeypatch.setattr(signals, "get_history", lambda *_, **__: payload)
+@pytest.fixture(scope="module")
+def tech_payload() -> Mapping:
+    return _frozen_payload(_TECH_CLOSES, "TECH")
 
-    with pytest.raises(HTTPException) as exc:
-        signals.tech_signals(
-            "miss",
-            date(2024, 1, 1),
-            date(2024, 1, 4),
-            window=2,
-            fast=1,
-            slow=2,
-        )
 
-    assert exc.value.status_code == 500
+@pytest.fixture(scope="module")
+def short_payload() -> Mapping:
+    return _frozen_payload([10.0, 11.0, 12.0], "SHORT")
 
 
-def test_tech_signals_rsi_none_with_short_series(monkeypatch: pytest.MonkeyPatch) -> None:
-    closes = [10.0, 11.0, 12.0, 13.0]
-    payload = make_history_payload(closes, ticker="RSI")
-    monkeypatch.setattr(signals, "get_history", lambda *_, **__: payload)
+@pytest.fixture(scope="module")
+def miss_payload() -> Mapping:
+    return _frozen_payload([10.0, 11.0, 12.0, 13.0], "MISS", drop_close=True)
 
-    result = signals.tech_signals(
-        "rsi",
-        date(2024, 1, 1),
-        date(2024, 1, 4),
-        window=2,
-        fast=2,
-        slow=3,
-        rsi_period=10,
-    )
 
-    assert result["rsi"] is None
+@pytest.fixture(scope="module")
+def rsi_payload() -> Mapping:
+    return _frozen_payload([10.0, 11.0, 12.0, 13.0], "RSI")
 
 
-def test_tech_signals_without_cross(monkeypatch: pytest.MonkeyPatch) -> None:
-    closes = [10.0, 10.0, 10.0, 10.0]
-    payload = make_history_payload(closes, ticker="FLAT")
-    monkeypatch.setattr(signals, "get_history", lambda *_, **__: payload)
+@pytest.fixture(scope="module")
+def flat_payload() -> Mapping:
+    return _frozen_payload([10.0, 10.0, 10.0, 10.0], "FLAT")
 
-    result = signals.tech_signals(
-        "flat",
-        date(2024, 1, 1),
-        date(2024, 1, 4),
-        window=2,
-        fast=2,
-        slow=2,
-        rsi_period=3,
-    )
 
-    assert result["last_cross_date"] is None
-    assert result["last_cross_type"] is None
+def test_rsi_returns_none_for_constant_series() -> None:
+    series = np.array([10.0, 10.0, 10.0, 10.0])
+    assert signals._rsi(series, period=3) is None
+
+
+@lru_cache(maxsize=32)
+def _rsi_oracle(closes: tuple[float, ...], period: int) -> float | None:
+    return signals._rsi(np.asarray(closes, dtype=np.float64), period)
+
+
+def _assert_tech_success(result: dict, payload: Mapping) -> None:
+    closes = _TECH_CLOSES
+    arr = np.asarray(closes, dtype=np.float64)
+    csum = np.concatenate(([0.0], arr.cumsum()))
+    roll2 = (csum[2:] - csum[:-2]) / 2
+    roll3 = (csum[3:] - csum[:-3]) / 3
+    momentum = closes[-1] / closes[-4] - 1.0
+    sma_fast = float(roll2[-1])
+    sma_slow = float(roll3[-1])
+    # Pad back to the series length so index i lines up with payload["data"][i].
+    fast_full = np.pad(roll2, (1, 0), constant_values=np.nan)
+    slow_full = np.pad(roll3, (2, 0), constant_values=np.nan)
+    cross_change = np.diff((fast_full > slow_full).astype(np.int8))
+    last_idx = int(np.flatnonzero(cross_change)[-1]) + 1
+    last_cross_date = payload["data"][last_idx]["date"]
+    last_cross_type = "golden" if cross_change[last_idx - 1] > 0 else "death"
+    expected_rsi = _rsi_oracle(closes, 3)
+
+    expected = {
+        "ticker": "TECH",
+        "count": len(closes),
+        "price": closes[-1],
+        "momentum_window": 3,
+        "momentum": momentum,
+        "sma_fast_window": 2,
+        "sma_fast": sma_fast,
+        "sma_slow_window": 3,
+        "sma_slow": sma_slow,
+        "cross_now": True,
+        "last_cross_date": last_cross_date,
+        "last_cross_type": last_cross_type,
+        "rsi_period": 3,
+        "rsi": expected_rsi,
+    }
+    assert {key: result[key] for key in expected} == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    ("payload_fixture", "end", "kwargs", "expected"),
+    [
+        pytest.param("tech_payload", _END_6, dict(window=3, fast=2, slow=3, rsi_period=3), "success", id="success"),
+        pytest.param("short_payload", _END_3, dict(window=3, slow=3), 404, id="requires-enough-history"),
+        pytest.param("miss_payload", _END_4, dict(window=2, fast=1, slow=2), 500, id="requires-close-column"),
+        pytest.param("rsi_payload", _END_4, dict(window=2, fast=2, slow=3, rsi_period=10), "rsi_none", id="rsi-none"),
+        pytest.param("flat_payload", _END_4, dict(window=2, fast=2, slow=2, rsi_period=3), "no_cross", id="without-cross"),
+    ],
+)
+def test_tech_signals(
+    request: pytest.FixtureRequest,
+    timed_tech_signals,
+    payload_fixture: str,
+    end: date,
+    kwargs: dict,
+    expected: int | str,
+) -> None:
+    payload = request.getfixturevalue(payload_fixture)
+    _PAYLOAD.set(payload)
+    args = (payload["ticker"].lower(), _START, end)
+
+    if isinstance(expected, int):
+        exc = pytest.raises(HTTPException, signals.tech_signals, *args, **kwargs)
+        assert exc.value.status_code == expected
+        return
+
+    if expected == "success":
+        _assert_tech_success(timed_tech_signals(*args, **kwargs), payload)
+        return
+
+    result = signals.tech_signals(*args, **kwargs)
+    if expected == "rsi_none":
+        assert result["rsi"] is None
+    else:
+        assert result["last_cross_date"] is None
+        assert result["last_cross_type"] is None